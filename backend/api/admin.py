@@ -0,0 +1,27 @@
+from django.contrib import admin
+from django.utils.html import format_html
+
+from api.models import RequestProfile
+from api.profiling import read_report
+
+
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'created', 'method', 'path', 'status',
+                    'duration_ms', 'db_queries', 'db_ms', 'user')
+    list_filter = ('method', 'status', 'route')
+    search_fields = ('path', 'route')
+    readonly_fields = ('report_content',)
+    exclude = ('report',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Отчёт')
+    def report_content(self, obj):
+        return format_html('<pre>{}</pre>', read_report(obj))
+
+
+admin.site.register(RequestProfile, RequestProfileAdmin)
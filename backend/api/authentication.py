@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router
+from django.utils.crypto import salted_hmac
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+User = get_user_model()
+
+TOKEN_CACHE = 'tokens'
+# Хеш пароля в кеш не попадает: поле остаётся отложенным и при
+# обращении загружается из базы.
+EXCLUDED_FIELDS = ('password',)
+
+
+def token_cache_key(key):
+    digest = salted_hmac(
+        'api.authentication.token', key, algorithm='sha256').hexdigest()
+    return f'token:{digest}'
+
+
+def dump_user(user):
+    return {
+        field.attname: getattr(user, field.attname)
+        for field in User._meta.concrete_fields
+        if field.attname not in EXCLUDED_FIELDS
+    }
+
+
+def load_user(data):
+    return User.from_db(
+        router.db_for_read(User), list(data), list(data.values()))
+
+
+def forget_tokens(*keys):
+    caches[TOKEN_CACHE].delete_many([token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, key):
+        cache = caches[TOKEN_CACHE]
+        cache_key = token_cache_key(key)
+        data = cache.get(cache_key)
+        if data is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(cache_key, dump_user(user))
+            return user, token
+        user = load_user(data)
+        if not user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        return user, Token(key=key, user=user)
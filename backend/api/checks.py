@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+from api.authentication import TOKEN_CACHE
+
+PER_PROCESS_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
+
+@register(Tags.caches, Tags.security)
+def check_token_cache(app_configs, **kwargs):
+    backend = settings.CACHES.get(TOKEN_CACHE, {}).get('BACKEND')
+    if backend not in PER_PROCESS_CACHE_BACKENDS:
+        return []
+    return [Error(
+        f'The "{TOKEN_CACHE}" cache must be shared between processes.',
+        hint=(
+            'Revoked tokens stay valid in other processes until the cache '
+            'timeout expires. Set TOKEN_CACHE_BACKEND to memcached or '
+            'redis, or to DummyCache to disable token caching.'
+        ),
+        obj=backend,
+        id='api.E001',
+    )]
@@ -1,13 +1,25 @@
 from django_filters.rest_framework import FilterSet, filters
-from rest_framework.filters import SearchFilter
+from rest_framework.filters import BaseFilterBackend
 
+from api.ingredient_index import ingredient_index
 from recipes.models import Recipe, Tag
+from recipes.rankings import ORDERINGS
+from recipes.versions import INGREDIENTS
 from users.models import User
 
 
-class IngredientSearchFilter(SearchFilter):
+class IngredientSearchFilter(BaseFilterBackend):
     search_param = 'name'
 
+    def filter_queryset(self, request, queryset, view):
+        if view.action != 'list':
+            return queryset
+        # Версию уже прочитал ConditionalGetMixin для ETag, повторный
+        # запрос к базе не нужен.
+        version, = view.request_versions(INGREDIENTS)
+        return ingredient_index.search(
+            request.query_params.get(self.search_param, ''), version)
+
 
 class RecipesFilter(FilterSet):
     tags = filters.ModelMultipleChoiceFilter(
@@ -24,10 +36,18 @@ class RecipesFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart',
     )
+    search = filters.CharFilter(
+        method='get_search',
+    )
+    ordering = filters.ChoiceFilter(
+        choices=[(ordering, ordering) for ordering in ORDERINGS],
+        method='get_ordering',
+    )
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart',
+                  'search', 'ordering')
 
     def get_is_favorited(self, queryset, name, value):
         user = self.request.user
@@ -40,3 +60,12 @@ class RecipesFilter(FilterSet):
         if value and user.is_authenticated:
             return queryset.filter(shoppingcart_recipe__user=user)
         return queryset
+
+    def get_search(self, queryset, name, value):
+        value = value.strip()
+        if value:
+            return queryset.search(value)
+        return queryset
+
+    def get_ordering(self, queryset, name, value):
+        return queryset.order_by_ranking(value)
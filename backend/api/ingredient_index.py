@@ -0,0 +1,83 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+
+from recipes.models import Ingredient
+from recipes.versions import INGREDIENTS, get_version
+
+
+class IngredientIndex:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked = None
+        self._entries = ([], [], '', [])
+
+    def _build(self, version):
+        rows = sorted(
+            (name.casefold(), name, measurement_unit, pk)
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit')
+        )
+        keys = [key for key, *_ in rows]
+        offsets = []
+        position = 0
+        for key in keys:
+            offsets.append(position)
+            position += len(key) + 1
+        self._entries = (
+            keys,
+            [
+                Ingredient(id=pk, name=name, measurement_unit=measurement_unit)
+                for _, name, measurement_unit, pk in rows
+            ],
+            '\n'.join(keys),
+            offsets,
+        )
+        self._version = version
+
+    def _refresh(self, version=None):
+        if version is None:
+            now = time.monotonic()
+            if self._checked is not None and (
+                    now - self._checked
+                    < settings.INGREDIENT_INDEX_CHECK_INTERVAL):
+                return
+            version = get_version(INGREDIENTS)
+            self._checked = now
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._build(version)
+
+    def search(self, query, version=None):
+        self._refresh(version)
+        keys, ingredients, haystack, offsets = self._entries
+        query = query.strip().casefold()
+        if not query:
+            return list(ingredients)
+        start = bisect_left(keys, query)
+        end = bisect_left(keys, query + '\U0010ffff', start)
+        return ingredients[start:end] + [
+            ingredients[index]
+            for index in self._containing(query, haystack, offsets)
+            if not start <= index < end
+        ]
+
+    @staticmethod
+    def _containing(query, haystack, offsets):
+        found = []
+        position = haystack.find(query)
+        while position != -1:
+            index = bisect_right(offsets, position) - 1
+            found.append(index)
+            position = haystack.find(
+                query, offsets[index + 1] if index + 1 < len(offsets)
+                else len(haystack))
+        return found
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,262 @@
+import json
+import logging
+import math
+import tempfile
+import time
+from io import StringIO
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import (CaptureQueriesContext, override_settings,
+                               setup_databases, setup_test_environment,
+                               teardown_databases, teardown_test_environment)
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+DATASETS = {
+    'small': {'users': 100, 'recipes': 1000, 'favorites': 5000,
+              'carts': 500, 'subscriptions': 1000},
+    'medium': {'users': 1000, 'recipes': 20000, 'favorites': 100000,
+               'carts': 10000, 'subscriptions': 20000},
+    'large': {'users': 10000, 'recipes': 200000, 'favorites': 1000000,
+              'carts': 100000, 'subscriptions': 200000},
+}
+# Имя сценария -> (максимум SQL-запросов, максимум p95 в миллисекундах).
+DEFAULT_BUDGETS = {
+    'recipes-list-anonymous': (6, 300),
+    'recipes-list': (8, 300),
+    'recipes-list-tags': (9, 300),
+    'recipes-list-author': (9, 300),
+    'recipes-list-favorited': (8, 300),
+    'recipes-list-in-cart': (8, 300),
+    'recipes-list-search': (8, 500),
+    'recipes-list-cursor': (7, 300),
+    'recipes-list-popular': (8, 300),
+    'recipes-list-trending': (8, 300),
+    'recipes-list-cooking-time': (8, 300),
+    'recipe-detail': (7, 100),
+    'recipes-feed': (7, 300),
+    'subscriptions': (5, 300),
+    'favorite-toggle': (17, 200),
+    'cart-toggle': (27, 200),
+    'recipe-create': (17, 300),
+    'recipe-update': (18, 300),
+    'shopping-list-download': (3, 300),
+}
+IMAGE = ('data:image/gif;base64,'
+         'R0lGODlhAQABAIAAAAUEBAAAACwAAAAAAQABAAACAkQBADs=')
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def consume(response):
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+class Command(BaseCommand):
+    help = ('Benchmark API endpoints on a test database and fail '
+            'when a query or latency budget is exceeded')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='small',
+            help='Comma separated datasets: ' + ', '.join(DATASETS))
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--budgets',
+            help='JSON file: {"scenario": {"queries": 8, "p95_ms": 300}}')
+        parser.add_argument(
+            '--only', action='append', dest='scenarios',
+            help='Run only the given scenario, may be repeated')
+
+    def handle(self, *args, **options):
+        sizes = options['sizes'].split(',')
+        unknown = set(sizes) - set(DATASETS)
+        if unknown:
+            raise CommandError(
+                'Неизвестные наборы данных: ' + ', '.join(sorted(unknown)))
+        budgets = self.load_budgets(options['budgets'])
+        failures = []
+        logging.getLogger('api.middleware').setLevel(logging.WARNING)
+        setup_test_environment(debug=False)
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with tempfile.TemporaryDirectory() as media_root:
+                with override_settings(MEDIA_ROOT=media_root):
+                    for size in sizes:
+                        failures.extend(
+                            self.run_dataset(size, budgets, options))
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+        if failures:
+            raise CommandError(
+                'Превышены бюджеты:\n' + '\n'.join(failures))
+        self.stdout.write('Все бюджеты соблюдены')
+
+    @staticmethod
+    def load_budgets(path):
+        budgets = {
+            name: {'queries': queries, 'p95_ms': p95}
+            for name, (queries, p95) in DEFAULT_BUDGETS.items()
+        }
+        if path:
+            with open(path, encoding='utf-8') as file:
+                for name, budget in json.load(file).items():
+                    budgets.setdefault(name, {}).update(budget)
+        return budgets
+
+    def load_dataset(self, size, seed):
+        call_command('flush', interactive=False, verbosity=0)
+        for cache in caches.all():
+            cache.clear()
+        call_command('import_ingredients', stdout=StringIO())
+        call_command('generate_data', seed=seed, stdout=StringIO(),
+                     **DATASETS[size])
+
+    def make_context(self):
+        user = User.objects.annotate(
+            subscriptions=Count('follower')).order_by('-subscriptions').first()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(
+            user=user).key)
+        recipe = Recipe.objects.order_by('-pub_date', '-id').first()
+        recipe_data = {
+            'ingredients': [
+                {'id': ingredient_id, 'amount': 10}
+                for ingredient_id in Ingredient.objects.values_list(
+                    'id', flat=True)[:5]
+            ],
+            'tags': list(Tag.objects.values_list('id', flat=True)[:2]),
+            'image': IMAGE,
+            'text': 'Описание рецепта для нагрузочного теста',
+            'cooking_time': 30,
+        }
+        own_recipe = client.post('/api/recipes/', dict(
+            recipe_data, name='Рецепт для обновления'), format='json')
+        return {
+            'user': user,
+            'client': client,
+            'anonymous': APIClient(),
+            'recipe': recipe,
+            'own_recipe_id': own_recipe.json()['id'],
+            'recipe_data': recipe_data,
+            'tag': Tag.objects.first().slug,
+            'counter': 0,
+        }
+
+    def scenarios(self, context):
+        client, anonymous = context['client'], context['anonymous']
+        recipe_url = f'/api/recipes/{context["recipe"].id}/'
+
+        def toggle(action):
+            url = f'{recipe_url}{action}/'
+            client.post(url)
+            return client.delete(url)
+
+        def create():
+            context['counter'] += 1
+            return client.post('/api/recipes/', dict(
+                context['recipe_data'],
+                name=f'Новый рецепт {context["counter"]}'), format='json')
+
+        def update():
+            context['counter'] += 1
+            return client.patch(
+                f'/api/recipes/{context["own_recipe_id"]}/', dict(
+                    context['recipe_data'],
+                    name=f'Обновлённый рецепт {context["counter"]}'),
+                format='json')
+
+        return {
+            'recipes-list-anonymous': lambda: anonymous.get('/api/recipes/'),
+            'recipes-list': lambda: client.get('/api/recipes/'),
+            'recipes-list-tags': lambda: client.get(
+                '/api/recipes/', {'tags': context['tag']}),
+            'recipes-list-author': lambda: client.get(
+                '/api/recipes/', {'author': context['recipe'].author_id}),
+            'recipes-list-favorited': lambda: client.get(
+                '/api/recipes/', {'is_favorited': 1}),
+            'recipes-list-in-cart': lambda: client.get(
+                '/api/recipes/', {'is_in_shopping_cart': 1}),
+            'recipes-list-search': lambda: client.get(
+                '/api/recipes/', {'search': context['recipe'].name}),
+            'recipes-list-cursor': lambda: client.get(
+                '/api/recipes/', {'pagination': 'cursor'}),
+            'recipes-list-popular': lambda: client.get(
+                '/api/recipes/', {'ordering': 'popular', 'page': 2}),
+            'recipes-list-trending': lambda: client.get(
+                '/api/recipes/', {'ordering': 'trending', 'page': 2}),
+            'recipes-list-cooking-time': lambda: client.get(
+                '/api/recipes/', {'ordering': 'cooking_time', 'page': 2}),
+            'recipe-detail': lambda: client.get(recipe_url),
+            'recipes-feed': lambda: client.get('/api/recipes/feed/'),
+            'subscriptions': lambda: client.get(
+                '/api/users/subscriptions/', {'recipes_limit': 3}),
+            'favorite-toggle': lambda: toggle('favorite'),
+            'cart-toggle': lambda: toggle('shopping_cart'),
+            'recipe-create': create,
+            'recipe-update': update,
+            'shopping-list-download': lambda: consume(client.get(
+                '/api/recipes/download_shopping_cart/')),
+        }
+
+    def measure(self, scenario, repeat):
+        timings = []
+        queries = 0
+        for _ in range(repeat + 1):
+            caches['responses'].clear()
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = scenario()
+                elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'Ответ {response.status_code}: {response.content[:200]}')
+            timings.append(elapsed * 1000)
+            queries = max(queries, len(context.captured_queries))
+        timings = timings[1:]
+        return percentile(timings, 0.5), percentile(timings, 0.95), queries
+
+    def run_dataset(self, size, budgets, options):
+        started = time.monotonic()
+        self.load_dataset(size, options['seed'])
+        self.stdout.write(
+            f'\nНабор данных {size}: {Recipe.objects.count()} рецептов, '
+            f'загружен за {time.monotonic() - started:.1f} с')
+        self.stdout.write(
+            f'{"Сценарий":<26}{"p50, мс":>10}{"p95, мс":>10}'
+            f'{"SQL":>6}{"Бюджет":>12}')
+        failures = []
+        for name, scenario in self.scenarios(self.make_context()).items():
+            if options['scenarios'] and name not in options['scenarios']:
+                continue
+            p50, p95, queries = self.measure(scenario, options['repeat'])
+            budget = budgets.get(name, {})
+            max_queries = budget.get('queries')
+            max_p95 = budget.get('p95_ms')
+            status = 'OK'
+            if max_queries is not None and queries > max_queries:
+                status = 'FAIL'
+                failures.append(
+                    f'{size}/{name}: {queries} SQL > {max_queries}')
+            if max_p95 is not None and p95 > max_p95:
+                status = 'FAIL'
+                failures.append(
+                    f'{size}/{name}: p95 {p95:.1f} мс > {max_p95} мс')
+            self.stdout.write(
+                f'{name:<26}{p50:>10.1f}{p95:>10.1f}{queries:>6}'
+                f'{f"{max_queries}/{max_p95}":>12} {status}')
+        return failures
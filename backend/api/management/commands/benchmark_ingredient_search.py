@@ -0,0 +1,49 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.ingredient_index import ingredient_index
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = 'Compare ingredient autocomplete: in-memory index vs ORM query'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', default=200, type=int)
+        parser.add_argument('--repeat', default=5, type=int)
+        parser.add_argument('--seed', default=0, type=int)
+
+    def measure(self, lookup, queries, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for query in queries:
+                lookup(query)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best / len(queries)
+
+    def handle(self, *args, **options):
+        names = list(Ingredient.objects.values_list('name', flat=True))
+        if not names:
+            raise CommandError('Сначала загрузите ингредиенты')
+        rng = random.Random(options['seed'])
+        queries = [
+            name[:rng.randint(1, min(len(name), 4))]
+            for name in rng.choices(names, k=options['queries'])
+        ]
+        ingredient_index.search('')
+        orm = self.measure(
+            lambda query: list(Ingredient.objects.filter(
+                name__istartswith=query)),
+            queries, options['repeat'])
+        index = self.measure(
+            ingredient_index.search, queries, options['repeat'])
+        self.stdout.write(
+            f'Ingredients: {len(names)}, queries: {len(queries)}\n'
+            f'ORM istartswith: {orm * 1e6:.1f} us/query\n'
+            f'Prefix index:    {index * 1e6:.1f} us/query\n'
+            f'Speedup:         {orm / index:.1f}x'
+        )
@@ -0,0 +1,128 @@
+from bisect import bisect_left
+from threading import Lock
+
+from django.http import HttpResponse
+
+from api.mixins import get_response_cache_stats
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (
+    256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def escape(value):
+    return (str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{escape(value)}"' for name, value in labels) + '}'
+
+
+class Histogram:
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.series = {}
+        self.lock = Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [
+                    [0] * (len(self.buckets) + 1), 0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self):
+        with self.lock:
+            series = {
+                key: (list(counts), total, count)
+                for key, (counts, total, count) in self.series.items()
+            }
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(
+                    (*self.buckets, '+Inf'), counts):
+                cumulative += bucket_count
+                yield (f'{self.name}_bucket'
+                       f'{format_labels((*key, ("le", bound)))} {cumulative}')
+            yield f'{self.name}_sum{format_labels(key)} {total}'
+            yield f'{self.name}_count{format_labels(key)} {count}'
+
+
+class Counter:
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self.values = {}
+        self.lock = Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def collect(self):
+        with self.lock:
+            values = dict(self.values)
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} counter'
+        for key, value in sorted(values.items()):
+            yield f'{self.name}{format_labels(key)} {value}'
+
+
+requests_total = Counter(
+    'foodgram_http_requests_total',
+    'Processed HTTP requests.')
+request_duration = Histogram(
+    'foodgram_http_request_duration_seconds',
+    'Time spent processing the request.', DURATION_BUCKETS)
+db_duration = Histogram(
+    'foodgram_http_request_db_duration_seconds',
+    'Time spent in SQL queries per request.', DURATION_BUCKETS)
+db_queries = Histogram(
+    'foodgram_http_request_db_queries',
+    'SQL queries executed per request.', QUERY_BUCKETS)
+serialize_duration = Histogram(
+    'foodgram_http_serialize_seconds',
+    'Time spent converting objects to response data.', DURATION_BUCKETS)
+render_duration = Histogram(
+    'foodgram_http_response_render_seconds',
+    'Time spent encoding the response body.', DURATION_BUCKETS)
+response_size = Histogram(
+    'foodgram_http_response_size_bytes',
+    'Response body size.', SIZE_BUCKETS)
+
+REGISTRY = (requests_total, request_duration, db_duration, db_queries,
+            serialize_duration, render_duration, response_size)
+
+
+def collect_response_cache():
+    yield ('# HELP foodgram_response_cache_total '
+           'Anonymous response cache lookups.')
+    yield '# TYPE foodgram_response_cache_total counter'
+    for result, value in sorted(get_response_cache_stats().items()):
+        yield f'foodgram_response_cache_total{{result="{result}"}} {value}'
+
+
+def metrics(request):
+    lines = [line for metric in REGISTRY for line in metric.collect()]
+    lines.extend(collect_response_cache())
+    return HttpResponse(
+        '\n'.join(lines) + '\n',
+        content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,157 @@
+import cProfile
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+
+from api import metrics, profiling
+
+logger = logging.getLogger(__name__)
+
+
+class QueryTimer:
+
+    def __init__(self, record=False):
+        self.count = 0
+        self.duration = 0
+        self.queries = [] if record else None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.duration += duration
+            self.count += 1
+            if self.queries is not None:
+                self.queries.append((sql, duration))
+
+
+class Stopwatch:
+
+    def __init__(self):
+        self.duration = 0
+
+    @contextmanager
+    def measure(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.duration += time.perf_counter() - started
+
+
+def get_route(request):
+    match = request.resolver_match
+    if match is None:
+        return 'unmatched'
+    view = getattr(match.func, 'cls', None)
+    if view is None:
+        return match.view_name or match.func.__name__
+    actions = getattr(match.func, 'actions', None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return f'{view.__name__}.{action}'
+
+
+class PerformanceMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        request.render_duration = 0
+        request.serialize_timer = Stopwatch()
+        started = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        route = get_route(request)
+        serialize_duration = request.serialize_timer.duration
+        response['Server-Timing'] = (
+            f'db;dur={timer.duration * 1000:.1f};'
+            f'desc="{timer.count} queries", '
+            f'serialize;dur={serialize_duration * 1000:.1f}, '
+            f'render;dur={request.render_duration * 1000:.1f}, '
+            f'total;dur={duration * 1000:.1f}'
+        )
+        metrics.requests_total.inc(
+            view=route, method=request.method, status=response.status_code)
+        metrics.request_duration.observe(duration, view=route)
+        metrics.serialize_duration.observe(serialize_duration, view=route)
+        metrics.render_duration.observe(request.render_duration, view=route)
+        record = {
+            'route': route,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 1),
+            'serialize_ms': round(serialize_duration * 1000, 1),
+            'render_ms': round(request.render_duration * 1000, 1),
+        }
+        if response.streaming:
+            response.streaming_content = self.count_streamed(
+                response.streaming_content, timer, record)
+        else:
+            self.finish(timer, record, len(response.content))
+        return response
+
+    def count_streamed(self, content, timer, record):
+        size = 0
+        try:
+            with connection.execute_wrapper(timer):
+                for chunk in content:
+                    size += len(chunk)
+                    yield chunk
+        finally:
+            self.finish(timer, record, size)
+
+    @staticmethod
+    def finish(timer, record, size):
+        route = record['route']
+        metrics.db_duration.observe(timer.duration, view=route)
+        metrics.db_queries.observe(timer.count, view=route)
+        metrics.response_size.observe(size, view=route)
+        record.update(
+            db_queries=timer.count,
+            db_ms=round(timer.duration * 1000, 1),
+            size=size,
+        )
+        logger.info(json.dumps(record, ensure_ascii=False))
+
+    def process_template_response(self, request, response):
+        started = time.perf_counter()
+
+        def rendered(response):
+            request.render_duration += time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+class ProfilingMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profiling.should_profile(request):
+            return self.get_response(request)
+        timer = QueryTimer(record=True)
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        duration = time.perf_counter() - started
+        profile = profiling.save_profile(
+            request, response, get_route(request), duration, profiler, timer)
+        response['X-Profile-Id'] = profile.pk
+        return response
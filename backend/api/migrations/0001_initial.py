@@ -0,0 +1,38 @@
+# Generated by Django 3.2 on 2026-10-18 19:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата')),
+                ('method', models.CharField(max_length=10, verbose_name='Метод')),
+                ('path', models.CharField(max_length=2000, verbose_name='Адрес')),
+                ('route', models.CharField(max_length=200, verbose_name='Обработчик')),
+                ('status', models.PositiveSmallIntegerField(verbose_name='Код ответа')),
+                ('duration_ms', models.FloatField(verbose_name='Время, мс')),
+                ('db_queries', models.PositiveIntegerField(verbose_name='SQL-запросов')),
+                ('db_ms', models.FloatField(verbose_name='Время SQL, мс')),
+                ('report', models.CharField(max_length=200, verbose_name='Файл отчёта')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='request_profiles', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Профиль запроса',
+                'verbose_name_plural': 'Профили запросов',
+                'ordering': ('-created',),
+            },
+        ),
+    ]
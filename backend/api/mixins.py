@@ -0,0 +1,168 @@
+import hashlib
+from functools import lru_cache
+
+from django.core.cache import caches
+from django.utils.cache import (get_conditional_response, patch_vary_headers,
+                                quote_etag)
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from recipes.versions import get_versions
+
+RESPONSE_CACHE = 'responses'
+RESPONSE_CACHE_STATS = ('hits', 'misses')
+
+
+@lru_cache(maxsize=None)
+def timed_serializer_class(serializer_class):
+
+    class TimedSerializer(serializer_class):
+
+        @property
+        def data(self):
+            timer = getattr(
+                self.context.get('request'), 'serialize_timer', None)
+            if timer is None:
+                return super().data
+            with timer.measure():
+                return super().data
+
+    TimedSerializer.__name__ = serializer_class.__name__
+    TimedSerializer.__qualname__ = serializer_class.__qualname__
+    return TimedSerializer
+
+
+class SerializationTimingMixin:
+
+    def get_serializer(self, *args, **kwargs):
+        return self.timed(super().get_serializer(*args, **kwargs))
+
+    @staticmethod
+    def timed(serializer):
+        # Подменяем класс, а не оборачиваем объект: ReturnDict/ReturnList
+        # и браузерный API ожидают настоящий сериализатор.
+        serializer.__class__ = timed_serializer_class(type(serializer))
+        return serializer
+
+
+class RequestVersionsMixin:
+
+    def request_versions(self, *names):
+        known = self.__dict__.setdefault('_request_versions', {})
+        missing = [name for name in names if name not in known]
+        if missing:
+            known.update(zip(missing, get_versions(*missing)))
+        return [known[name] for name in names]
+
+
+class ConditionalGetMixin(RequestVersionsMixin):
+
+    @staticmethod
+    def make_etag(*parts):
+        return quote_etag(hashlib.md5(
+            ':'.join(map(str, parts)).encode()).hexdigest())
+
+    def get_validators(self):
+        return None, None
+
+    def get_list_validators(self):
+        return self.get_validators()
+
+    def get_object_validators(self):
+        return self.get_validators()
+
+    def conditional_response(self, validators, handler, request, *args,
+                             **kwargs):
+        etag, last_modified = validators
+        if etag is None and last_modified is None:
+            return handler(request, *args, **kwargs)
+        timestamp = (
+            int(last_modified.timestamp()) if last_modified else None)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        if etag:
+            response['ETag'] = etag
+        if timestamp:
+            response['Last-Modified'] = http_date(timestamp)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.get_list_validators(), super().list, request, *args,
+            **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.get_object_validators(), super().retrieve, request, *args,
+            **kwargs)
+
+
+def count_response_cache(stat):
+    key = f'response-cache:{stat}'
+    cache = caches[RESPONSE_CACHE]
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def get_response_cache_stats():
+    cache = caches[RESPONSE_CACHE]
+    stats = cache.get_many(
+        [f'response-cache:{stat}' for stat in RESPONSE_CACHE_STATS])
+    return {
+        stat: stats.get(f'response-cache:{stat}', 0)
+        for stat in RESPONSE_CACHE_STATS
+    }
+
+
+def normalize_query(query_params, names=None):
+    names = sorted(query_params) if names is None else names
+    return '&'.join(
+        f'{name}={value}'
+        for name in names
+        for value in sorted(set(query_params.getlist(name)))
+    )
+
+
+class AnonymousListCacheMixin(RequestVersionsMixin):
+    cache_query_params = ()
+    cache_versions = ()
+
+    def get_cache_versions(self):
+        return self.cache_versions
+
+    def get_cache_key(self, request):
+        params = normalize_query(
+            request.query_params, self.cache_query_params)
+        versions = ':'.join(map(str, self.request_versions(
+            *self.get_cache_versions())))
+        digest = hashlib.md5(
+            f'{request.get_host()}?{params}'.encode()).hexdigest()
+        return f'{self.basename}-list:{versions}:{digest}'
+
+    def list(self, request, *args, **kwargs):
+        if not request.user.is_anonymous:
+            return super().list(request, *args, **kwargs)
+        cache = caches[RESPONSE_CACHE]
+        key = self.get_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            count_response_cache('hits')
+            data, etag = cached
+            response = self.conditional_response(
+                (etag, None), lambda *args, **kwargs: Response(data),
+                request)
+            response['X-Cache'] = 'HIT'
+            return response
+        count_response_cache('misses')
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, (response.data, response.get('ETag')))
+        response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+
+User = get_user_model()
+
+
+class RequestProfile(models.Model):
+    created = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Дата'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='request_profiles',
+        verbose_name='Пользователь'
+    )
+    method = models.CharField(
+        max_length=10,
+        verbose_name='Метод'
+    )
+    path = models.CharField(
+        max_length=2000,
+        verbose_name='Адрес'
+    )
+    route = models.CharField(
+        max_length=200,
+        verbose_name='Обработчик'
+    )
+    status = models.PositiveSmallIntegerField(
+        verbose_name='Код ответа'
+    )
+    duration_ms = models.FloatField(
+        verbose_name='Время, мс'
+    )
+    db_queries = models.PositiveIntegerField(
+        verbose_name='SQL-запросов'
+    )
+    db_ms = models.FloatField(
+        verbose_name='Время SQL, мс'
+    )
+    report = models.CharField(
+        max_length=200,
+        verbose_name='Файл отчёта'
+    )
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = 'Профиль запроса'
+        verbose_name_plural = 'Профили запросов'
+
+    def __str__(self):
+        return f'{self.method} {self.path}'
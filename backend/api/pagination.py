@@ -1,7 +1,111 @@
-from rest_framework.pagination import PageNumberPagination
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import (Cursor, CursorPagination,
+                                       PageNumberPagination)
 
 
 class CustomPagination(PageNumberPagination):
 
     page_size = 6
     page_size_query_param = 'limit'
+
+
+class RecipeCursorPagination(CursorPagination):
+
+    page_size = 6
+    page_size_query_param = 'limit'
+    ordering = ('-pub_date', '-id')
+
+    @staticmethod
+    def get_position(recipe):
+        return f'{recipe.pub_date.isoformat()}|{recipe.pk}'
+
+    def parse_position(self, position):
+        try:
+            pub_date, pk = position.split('|')
+            return datetime.fromisoformat(pub_date), int(pk)
+        except (AttributeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        if reverse:
+            queryset = queryset.order_by('pub_date', 'id')
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if self.cursor is not None:
+            pub_date, pk = self.parse_position(self.cursor.position)
+            lookup = 'gt' if reverse else 'lt'
+            queryset = queryset.filter(
+                Q(**{f'pub_date__{lookup}e': pub_date}),
+                Q(**{f'pub_date__{lookup}': pub_date})
+                | Q(pub_date=pub_date, **{f'pk__{lookup}': pk}),
+            )
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Cursor(
+            offset=0, reverse=False, position=self.get_position(
+                self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(Cursor(
+            offset=0, reverse=True, position=self.get_position(
+                self.page[0])))
+
+
+class RecipePagination(CustomPagination):
+
+    mode_query_param = 'pagination'
+    ordering_query_param = 'ordering'
+    cursor_pagination_class = RecipeCursorPagination
+
+    def __init__(self):
+        self.cursor_paginator = None
+
+    def use_cursor(self, request):
+        cursor_query_param = self.cursor_pagination_class.cursor_query_param
+        return (cursor_query_param in request.query_params
+                or request.query_params.get(self.mode_query_param)
+                == 'cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.use_cursor(request):
+            self.cursor_paginator = None
+            return super().paginate_queryset(queryset, request, view)
+        if request.query_params.get(self.ordering_query_param):
+            raise ValidationError({self.ordering_query_param: [
+                'Курсорная пагинация поддерживает только сортировку '
+                'по дате публикации.']})
+        self.cursor_paginator = self.cursor_pagination_class()
+        return self.cursor_paginator.paginate_queryset(
+            queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is None:
+            return super().get_paginated_response(data)
+        return self.cursor_paginator.get_paginated_response(data)
+
+    def to_html(self):
+        if self.cursor_paginator is None:
+            return super().to_html()
+        return self.cursor_paginator.to_html()
@@ -0,0 +1,105 @@
+import os
+import pstats
+import random
+from io import StringIO
+from uuid import uuid4
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.settings import api_settings
+
+from api.models import RequestProfile
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAM = 'profile'
+REPORT_FUNCTIONS = 60
+
+
+def get_request_user(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        try:
+            result = authentication_class().authenticate(request)
+        except AuthenticationFailed:
+            return None
+        if result is not None:
+            return result[0]
+    return None
+
+
+def should_profile(request):
+    if request.META.get(PROFILE_HEADER) or PROFILE_PARAM in request.GET:
+        user = get_request_user(request)
+        if user is not None and user.is_staff:
+            return True
+    return random.random() < settings.PROFILING_SAMPLE_RATE
+
+
+def report_path(name, extension):
+    return os.path.join(settings.PROFILING_ROOT, f'{name}.{extension}')
+
+
+def write_report(name, request, route, status, duration, profiler, timer):
+    os.makedirs(settings.PROFILING_ROOT, exist_ok=True)
+    profiler.dump_stats(report_path(name, 'prof'))
+    stats = StringIO()
+    pstats.Stats(profiler, stream=stats).sort_stats(
+        'cumulative').print_stats(REPORT_FUNCTIONS)
+    lines = [
+        f'{request.method} {request.get_full_path()}',
+        f'Route: {route}',
+        f'Status: {status}',
+        f'Total: {duration * 1000:.1f} ms',
+        f'SQL: {timer.count} queries, {timer.duration * 1000:.1f} ms',
+        '',
+        'SQL queries by duration:',
+    ]
+    lines.extend(
+        f'{query_duration * 1000:9.2f} ms  {sql}'
+        for sql, query_duration in sorted(
+            timer.queries, key=lambda query: query[1], reverse=True)
+    )
+    lines.extend(('', 'Profile:', stats.getvalue()))
+    with open(report_path(name, 'txt'), 'w', encoding='utf-8') as file:
+        file.write('\n'.join(lines))
+
+
+def read_report(profile):
+    try:
+        with open(report_path(profile.report, 'txt'),
+                  encoding='utf-8') as file:
+            return file.read()
+    except FileNotFoundError:
+        return ''
+
+
+def delete_report(profile):
+    for extension in ('txt', 'prof'):
+        try:
+            os.remove(report_path(profile.report, extension))
+        except FileNotFoundError:
+            pass
+
+
+def save_profile(request, response, route, duration, profiler, timer):
+    name = f'{timezone.now():%Y%m%d-%H%M%S}-{uuid4().hex[:8]}'
+    write_report(name, request, route, response.status_code, duration,
+                 profiler, timer)
+    stale = RequestProfile.objects.values_list('pk', flat=True)[
+        max(settings.PROFILING_MAX_REPORTS - 1, 0):]
+    RequestProfile.objects.filter(pk__in=list(stale)).delete()
+    user = getattr(request, 'user', None)
+    return RequestProfile.objects.create(
+        user=user if user is not None and user.is_authenticated else None,
+        method=request.method,
+        path=request.get_full_path()[:2000],
+        route=route[:200],
+        status=response.status_code,
+        duration_ms=round(duration * 1000, 1),
+        db_queries=timer.count,
+        db_ms=round(timer.duration * 1000, 1),
+        report=name,
+    )
@@ -0,0 +1,168 @@
+import csv
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+PDF_FONT_SIZE = 11
+PDF_LEADING = 16
+PDF_LINES_PER_PAGE = 46
+PDF_PAGE_SIZE = (595, 842)
+PDF_MARGIN = 50
+
+# cp1251 -> имена глифов кириллицы для шрифта Helvetica.
+PDF_CYRILLIC_DIFFERENCES = (
+    '168 /afii10023 184 /afii10071 185 /afii61352 192 '
+    + ' '.join(
+        f'/afii{code}'
+        for code in (*range(10017, 10023), *range(10024, 10050),
+                     *range(10065, 10071), *range(10072, 10098))
+    )
+)
+
+
+class Echo:
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListRenderer(BaseRenderer):
+    title = 'Список покупок:'
+
+    @staticmethod
+    def format_row(row):
+        return (f'{row["ingredient__name"]} - {row["ingredient_amount"]}, '
+                f'{row["ingredient__measurement_unit"]}')
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False).encode()
+
+    def stream(self, rows):
+        raise NotImplementedError('.stream() must be implemented')
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, rows):
+        yield f'{self.title}\n'.encode()
+        for row in rows:
+            yield f'\n{self.format_row(row)}'.encode()
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(
+            ('Ингредиент', 'Количество', 'Единица измерения')).encode()
+        for row in rows:
+            yield writer.writerow((
+                row['ingredient__name'],
+                row['ingredient_amount'],
+                row['ingredient__measurement_unit'],
+            )).encode()
+
+
+class ShoppingListJSONRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, rows):
+        separator = '['
+        for row in rows:
+            yield (separator + json.dumps({
+                'name': row['ingredient__name'],
+                'amount': row['ingredient_amount'],
+                'measurement_unit': row['ingredient__measurement_unit'],
+            }, ensure_ascii=False)).encode()
+            separator = ','
+        yield b'[]' if separator == '[' else b']'
+
+
+class ShoppingListPDFRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+    @staticmethod
+    def encode_text(text):
+        encoded = text.encode('cp1251', errors='replace')
+        return (encoded.replace(b'\\', b'\\\\')
+                .replace(b'(', b'\\(').replace(b')', b'\\)'))
+
+    def page_content(self, lines):
+        content = [
+            b'BT',
+            f'/F1 {PDF_FONT_SIZE} Tf {PDF_LEADING} TL'.encode(),
+            f'{PDF_MARGIN} {PDF_PAGE_SIZE[1] - PDF_MARGIN} Td'.encode(),
+        ]
+        content.extend(
+            b'(' + self.encode_text(line) + b") '" for line in lines)
+        content.append(b'ET')
+        return b'\n'.join(content)
+
+    def stream(self, rows):
+        offsets = {}
+        position = 0
+        pages = []
+
+        def write_object(number, body):
+            nonlocal position
+            offsets[number] = position
+            chunk = f'{number} 0 obj\n'.encode() + body + b'\nendobj\n'
+            position += len(chunk)
+            return chunk
+
+        def write_page(lines):
+            content = self.page_content(lines)
+            content_number = len(offsets) + 1
+            page_number = content_number + 1
+            pages.append(page_number)
+            return write_object(
+                content_number,
+                f'<< /Length {len(content)} >>\nstream\n'.encode()
+                + content + b'\nendstream'
+            ) + write_object(
+                page_number,
+                ('<< /Type /Page /Parent 2 0 R '
+                 f'/MediaBox [0 0 {PDF_PAGE_SIZE[0]} {PDF_PAGE_SIZE[1]}] '
+                 '/Resources << /Font << /F1 3 0 R >> >> '
+                 f'/Contents {content_number} 0 R >>').encode()
+            )
+
+        header = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+        position = len(header)
+        yield header
+        yield write_object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        offsets[2] = None
+        yield write_object(3, (
+            '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica '
+            '/Encoding << /Type /Encoding /BaseEncoding /WinAnsiEncoding '
+            f'/Differences [{PDF_CYRILLIC_DIFFERENCES}] >> >>'
+        ).encode())
+
+        lines = [self.title, '']
+        for row in rows:
+            lines.append(self.format_row(row))
+            if len(lines) == PDF_LINES_PER_PAGE:
+                yield write_page(lines)
+                lines = []
+        if lines or not pages:
+            yield write_page(lines)
+
+        kids = ' '.join(f'{number} 0 R' for number in pages)
+        yield write_object(2, (
+            f'<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>'
+        ).encode())
+        xref = [f'xref\n0 {len(offsets) + 1}\n', '0000000000 65535 f \n']
+        xref.extend(
+            f'{offsets[number]:010d} 00000 n \n'
+            for number in range(1, len(offsets) + 1)
+        )
+        yield ''.join(xref).encode()
+        yield (f'trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\n'
+               f'startxref\n{position}\n%%EOF\n').encode()
@@ -1,12 +1,157 @@
+import base64
+import binascii
+import json
+import os
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import QueryDict
+from django.template.defaultfilters import filesizeformat
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS, ManyRelatedField
 
+from api.uploads import TOO_LARGE_MESSAGE
+from recipes import shopping_list
+from recipes.images import variant_urls
 from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
                             ShoppingСart, Tag)
+from recipes.storage import content_storage
 from users.models import Subscription, User
 
 
+class ImageVariantsField(serializers.ReadOnlyField):
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        urls = variant_urls(recipe)
+        request = self.context.get('request')
+        if urls is None or request is None:
+            return urls
+        return {
+            size: {
+                extension: request.build_absolute_uri(url)
+                for extension, url in formats.items()
+            }
+            for size, formats in urls.items()
+        }
+
+
+class RecipeImageField(Base64ImageField):
+    default_error_messages = {
+        'too_large': TOO_LARGE_MESSAGE,
+        'too_big_dimensions': ('Размер изображения не может превышать '
+                               '{max_dimension}x{max_dimension} пикселей.'),
+    }
+
+    def fail_too_large(self):
+        self.fail('too_large',
+                  max_size=filesizeformat(settings.MAX_IMAGE_UPLOAD_SIZE))
+
+    def check_size(self, size):
+        if size > settings.MAX_IMAGE_UPLOAD_SIZE:
+            self.fail_too_large()
+
+    def validate_empty_values(self, data):
+        request = self.context.get('request')
+        if self.field_name in getattr(request, 'oversized_files', ()):
+            self.fail_too_large()
+        return super().validate_empty_values(data)
+
+    def get_unchanged_image(self, data):
+        recipe = getattr(self.parent, 'instance', None)
+        if recipe is None or not recipe.image:
+            return None
+        if isinstance(data, UploadedFile):
+            content = data
+        elif isinstance(data, str):
+            if data.endswith(recipe.image.url):
+                return recipe.image
+            try:
+                content = ContentFile(base64.b64decode(
+                    data.partition(';base64,')[2] or data))
+            except (binascii.Error, ValueError):
+                return None
+        else:
+            return None
+        name = os.path.splitext(os.path.basename(recipe.image.name))[0]
+        if content_storage.content_hash(content) == name:
+            return recipe.image
+        return None
+
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            self.check_size(data.size)
+        elif isinstance(data, str):
+            self.check_size(len(data) * 3 // 4)
+        unchanged = self.get_unchanged_image(data)
+        if unchanged is not None:
+            return unchanged
+        if isinstance(data, UploadedFile):
+            image = serializers.ImageField.to_internal_value(self, data)
+        else:
+            image = super().to_internal_value(data)
+        if image is not None and max(image.image.size) > (
+                settings.MAX_IMAGE_DIMENSION):
+            self.fail('too_big_dimensions',
+                      max_dimension=settings.MAX_IMAGE_DIMENSION)
+        return image
+
+
+class BulkManyRelatedField(ManyRelatedField):
+
+    def to_internal_value(self, data):
+        if isinstance(data, (list, tuple)):
+            self.child_relation.prefetch(data)
+        return super().to_internal_value(data)
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    resolved = None
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def to_pk(self, data):
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        if isinstance(data, bool):
+            raise TypeError
+        return self.get_queryset().model._meta.pk.to_python(data)
+
+    def prefetch(self, values):
+        pks = set()
+        for value in values:
+            try:
+                pks.add(self.to_pk(value))
+            except (TypeError, ValueError, DjangoValidationError):
+                continue
+        self.resolved = self.get_queryset().in_bulk(pks)
+
+    def to_internal_value(self, data):
+        if self.resolved is None:
+            return super().to_internal_value(data)
+        try:
+            return self.resolved[self.to_pk(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError, DjangoValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
 class CustomUserSerializer(UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
@@ -18,6 +163,8 @@ class CustomUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
@@ -62,13 +209,23 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
+class IngredientAddAmountListSerializer(serializers.ListSerializer):
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.child.fields['id'].prefetch(
+                item.get('id') for item in data if isinstance(item, dict))
+        return super().to_internal_value(data)
+
+
 class IngredientAddAmountSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = BulkPrimaryKeyRelatedField(queryset=Ingredient.objects.all())
     amount = serializers.IntegerField()
 
     class Meta:
         model = IngredientInRecipe
         fields = ('id', 'amount')
+        list_serializer_class = IngredientAddAmountListSerializer
 
 
 class RecipeSerializer(serializers.ModelSerializer):
@@ -81,20 +238,25 @@ class RecipeSerializer(serializers.ModelSerializer):
         read_only=True,)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    images = ImageVariantsField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients', 'is_favorited',
-                  'is_in_shopping_cart', 'name', 'image', 'text',
+                  'is_in_shopping_cart', 'name', 'image', 'images', 'text',
                   'cooking_time')
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
         return Favorite.objects.filter(user=user, recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
@@ -103,9 +265,9 @@ class RecipeSerializer(serializers.ModelSerializer):
 
 class AddRecipeSerializer(serializers.ModelSerializer):
     ingredients = IngredientAddAmountSerializer(many=True, write_only=True)
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BulkPrimaryKeyRelatedField(
         queryset=Tag.objects.all(), many=True)
-    image = Base64ImageField()
+    image = RecipeImageField()
     name = serializers.CharField(max_length=200)
     cooking_time = serializers.IntegerField()
 
@@ -113,13 +275,38 @@ class AddRecipeSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ('ingredients', 'tags', 'image',
                   'name', 'text', 'cooking_time')
-        validators = [
-            serializers.UniqueTogetherValidator(
-                queryset=Recipe.objects.all(),
-                fields=('name', 'text'),
-                message='Рецепт уже существует!'
-            )
-        ]
+
+    def validate(self, data):
+        recipes = Recipe.objects.filter(content_hash=Recipe.get_content_hash(
+            data.get('name', getattr(self.instance, 'name', None)),
+            data.get('text', getattr(self.instance, 'text', None)),
+        ))
+        if self.instance is not None:
+            recipes = recipes.exclude(pk=self.instance.pk)
+        if recipes.exists():
+            raise serializers.ValidationError('Рецепт уже существует!')
+        return data
+
+    def to_internal_value(self, data):
+        if isinstance(data, QueryDict):
+            data = self.parse_form_data(data)
+        return super().to_internal_value(data)
+
+    @staticmethod
+    def parse_form_data(data):
+        parsed = data.dict()
+        for field in ('ingredients', 'tags'):
+            if field not in data:
+                continue
+            values = data.getlist(field)
+            if len(values) == 1 and values[0].lstrip().startswith('['):
+                try:
+                    values = json.loads(values[0])
+                except ValueError:
+                    raise serializers.ValidationError(
+                        {field: ['Некорректный JSON.']})
+            parsed[field] = values
+        return parsed
 
     def validate_ingredients(self, ingredients):
         if not ingredients:
@@ -142,8 +329,7 @@ class AddRecipeSerializer(serializers.ModelSerializer):
         return data
 
     def validate_tags(self, data):
-        tags = self.initial_data.get('tags')
-        if not tags:
+        if not data:
             raise serializers.ValidationError(
                 'Поле тэгов не может быть пустым!')
         return data
@@ -160,6 +346,7 @@ class AddRecipeSerializer(serializers.ModelSerializer):
         ]
         IngredientInRecipe.objects.bulk_create(ingredient_list)
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
@@ -168,77 +355,119 @@ class AddRecipeSerializer(serializers.ModelSerializer):
         self.create_ingredients(ingredients, recipe)
         return recipe
 
+    @staticmethod
+    def update_ingredients(recipe, ingredients):
+        existing = {
+            item.ingredient_id: item
+            for item in recipe.ingredient_recipe.all()
+        }
+        old_amounts = {
+            ingredient_id: item.amount
+            for ingredient_id, item in existing.items()
+        }
+        new_amounts = {
+            ingredient['id'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        changed = []
+        for ingredient_id, item in existing.items():
+            amount = new_amounts.get(ingredient_id)
+            if amount is not None and amount != item.amount:
+                item.amount = amount
+                changed.append(item)
+        IngredientInRecipe.objects.filter(pk__in=[
+            item.pk for ingredient_id, item in existing.items()
+            if ingredient_id not in new_amounts
+        ]).delete()
+        IngredientInRecipe.objects.bulk_update(changed, ['amount'])
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount)
+            for ingredient_id, amount in new_amounts.items()
+            if ingredient_id not in existing
+        )
+        shopping_list.change_recipe(recipe.id, old_amounts, new_amounts)
+
+    @staticmethod
+    def update_tags(recipe, tags):
+        existing = set(recipe.tags.values_list('id', flat=True))
+        new = {tag.id for tag in tags}
+        if existing - new:
+            recipe.tags.remove(*(existing - new))
+        if new - existing:
+            recipe.tags.add(*(new - existing))
+
+    @transaction.atomic
     def update(self, recipe, validated_data):
-        recipe.ingredients.clear()
-        recipe.tags.clear()
-        ingredients = validated_data.pop('ingredients')
-        tags = validated_data.pop('tags')
-        self.create_ingredients(ingredients, recipe)
-        recipe.tags.set(tags)
+        recipe = Recipe.objects.select_for_update().get(pk=recipe.pk)
+        ingredients = validated_data.pop('ingredients', None)
+        tags = validated_data.pop('tags', None)
+        if ingredients is not None:
+            self.update_ingredients(recipe, ingredients)
+        if tags is not None:
+            self.update_tags(recipe, tags)
         return super().update(recipe, validated_data)
 
     def to_representation(self, value):
+        prefetch_related_objects([value], 'tags', Prefetch(
+            'ingredient_recipe',
+            queryset=IngredientInRecipe.objects.select_related('ingredient')
+        ))
         serializer = RecipeSerializer(value, context=self.context)
         return serializer.data
 
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
     image = Base64ImageField()
+    images = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'images', 'cooking_time')
         read_only_fields = ('id', 'name', 'image', 'cooking_time',)
 
 
-class FavoriteSerializer(serializers.ModelSerializer):
-
-    class Meta:
-        model = Favorite
-        fields = ('user', 'recipe')
-
-    def validate(self, data):
-        user, recipe = data.get('user'), data.get('recipe')
-        if self.Meta.model.objects.filter(user=user, recipe=recipe).exists():
-            raise serializers.ValidationError('Рецепт уже в избранном!')
-        return data
-
-    def to_representation(self, instance):
-        request = self.context.get('request')
-        context = {'request': request}
-        return ShortRecipeSerializer(instance.recipe, context=context).data
-
-
-class ShoppingCartSerializer(FavoriteSerializer):
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = BulkPrimaryKeyRelatedField(
+        queryset=Recipe.objects.only('id'), many=True, allow_empty=False)
 
-    class Meta(FavoriteSerializer.Meta):
-        model = ShoppingСart
+    def validate_recipes(self, recipes):
+        if len(recipes) > settings.MAX_BULK_RECIPES:
+            raise serializers.ValidationError(
+                'Можно передать не больше '
+                f'{settings.MAX_BULK_RECIPES} рецептов.')
+        return recipes
 
 
 class RecipeForUserSerializer(serializers.ModelSerializer):
+    images = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'images', 'cooking_time')
 
 
 class SubscriptionSerializer(CustomUserSerializer):
     recipes = serializers.SerializerMethodField(read_only=True)
-    recipes_count = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = User
         fields = ('email', 'id', 'username', 'first_name', 'last_name',
                   'is_subscribed', 'recipes', 'recipes_count')
 
-    @staticmethod
-    def get_recipes_count(obj):
-        return obj.recipes.count()
-
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        recipes = obj.recipes.all()
-        recipes_limit = request.query_params.get('recipes_limit')
-        if recipes_limit:
-            recipes = recipes[:int(recipes_limit)]
+        recipes = getattr(obj, 'latest_recipes', None)
+        if recipes is None:
+            recipes = obj.recipes.all()
+            recipes_limit = self.context.get('recipes_limit')
+            if recipes_limit:
+                recipes = recipes[:recipes_limit]
         return RecipeForUserSerializer(recipes, many=True).data
+
+
+class RecipesLimitSerializer(serializers.Serializer):
+    recipes_limit = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.MAX_RECIPES_LIMIT,
+        required=False,
+    )
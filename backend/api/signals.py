@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import forget_tokens
+from api.models import RequestProfile
+from api.profiling import delete_report
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=RequestProfile)
+def request_profile_deleted(instance, **kwargs):
+    delete_report(instance)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(instance, **kwargs):
+    # До коммита параллельный запрос ещё видит токен в базе и снова
+    # положил бы его в кеш, поэтому чистим кеш после коммита. Ключ
+    # запоминаем сразу: после удаления первичный ключ обнуляется.
+    key = instance.key
+    transaction.on_commit(lambda: forget_tokens(key))
+
+
+@receiver(post_save, sender=User)
+def user_saved(instance, update_fields, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    keys = list(Token.objects.filter(
+        user=instance).values_list('key', flat=True))
+    if keys:
+        transaction.on_commit(lambda: forget_tokens(*keys))
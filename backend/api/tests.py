@@ -0,0 +1,191 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import TOKEN_CACHE, token_cache_key
+from api.checks import check_token_cache
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingСart, Tag)
+from users.models import Subscription, User
+
+
+class RecipeQueryCountTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pw')
+        authors = [
+            User.objects.create_user(
+                username=f'author{number}',
+                email=f'author{number}@example.com', password='pw')
+            for number in range(5)
+        ]
+        Subscription.objects.create(user=cls.user, author=authors[0])
+        tags = [
+            Tag.objects.create(name=name, color=color, slug=slug)
+            for name, color, slug in (
+                ('Завтрак', Tag.ORANGE, 'breakfast'),
+                ('Обед', Tag.GREEN, 'lunch'),
+            )
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(10)
+        ]
+        for number in range(60):
+            recipe = Recipe.objects.create(
+                author=authors[number % len(authors)],
+                name=f'Рецепт {number}',
+                text='Описание',
+                cooking_time=10,
+            )
+            recipe.tags.set(tags)
+            IngredientInRecipe.objects.bulk_create(
+                IngredientInRecipe(
+                    recipe=recipe, ingredient=ingredient, amount=10)
+                for ingredient in ingredients[number % 5:number % 5 + 3]
+            )
+            if number % 2:
+                Favorite.objects.create(user=cls.user, recipe=recipe)
+            if number % 3:
+                ShoppingСart.objects.create(user=cls.user, recipe=recipe)
+        cls.recipe = recipe
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.anonymous = APIClient()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assert_list_queries(self, client, expected):
+        for limit in (6, 50):
+            with self.subTest(limit=limit):
+                caches['responses'].clear()
+                with self.assertNumQueries(expected) as queries:
+                    response = client.get('/api/recipes/', {'limit': limit})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['results']), limit)
+                for query in queries.captured_queries:
+                    if 'COUNT(' in query['sql']:
+                        self.assertNotIn('EXISTS', query['sql'])
+        return response
+
+    def test_list_anonymous(self):
+        self.assert_list_queries(self.anonymous, 6)
+
+    def test_list_authenticated(self):
+        response = self.assert_list_queries(self.client, 7)
+        favorited = set(Favorite.objects.filter(
+            user=self.user).values_list('recipe', flat=True))
+        in_cart = set(ShoppingСart.objects.filter(
+            user=self.user).values_list('recipe', flat=True))
+        for recipe in response.data['results']:
+            self.assertEqual(
+                recipe['is_favorited'], recipe['id'] in favorited)
+            self.assertEqual(
+                recipe['is_in_shopping_cart'], recipe['id'] in in_cart)
+
+    def test_retrieve(self):
+        for client in (self.anonymous, self.client):
+            with self.subTest(client=client):
+                with self.assertNumQueries(6):
+                    response = client.get(f'/api/recipes/{self.recipe.id}/')
+                self.assertEqual(response.status_code, 200)
+
+
+class IngredientSearchQueryCountTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            for name in ('Сахар', 'Соль', 'Сахарная пудра', 'Ванильный сахар'):
+                Ingredient.objects.create(name=name, measurement_unit='г')
+
+    def test_search(self):
+        self.client.get('/api/ingredients/', {'name': 'с'})
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/ingredients/', {'name': 'сах'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [ingredient['name'] for ingredient in response.data],
+            ['Сахар', 'Сахарная пудра', 'Ванильный сахар'])
+
+
+SHARED_TOKEN_CACHES = {
+    **settings.CACHES,
+    TOKEN_CACHE: {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-tokens',
+    },
+}
+
+
+@override_settings(CACHES=SHARED_TOKEN_CACHES)
+class TokenCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pw')
+        cls.key = Token.objects.create(user=cls.user).key
+
+    def setUp(self):
+        caches[TOKEN_CACHE].clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.key}')
+        self.assert_status(200)
+        self.assertTrue(self.is_cached())
+
+    def is_cached(self):
+        return caches[TOKEN_CACHE].get(
+            token_cache_key(self.key)) is not None
+
+    def assert_status(self, expected):
+        response = self.client.get('/api/users/me/')
+        self.assertEqual(response.status_code, expected)
+
+    def test_logout(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(self.is_cached())
+        self.assert_status(401)
+
+    def test_set_password(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/users/set_password/', {
+                'current_password': 'pw',
+                'new_password': 'Vfrc1vf!Gfhjkm',
+            })
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(self.is_cached())
+
+    def test_deactivation(self):
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertFalse(self.is_cached())
+        self.assert_status(401)
+
+    def test_deletion(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertFalse(self.is_cached())
+        self.assert_status(401)
+
+    def test_forget_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            Token.objects.get(key=self.key).delete()
+            self.assertTrue(self.is_cached())
+        for callback in callbacks:
+            callback()
+        self.assertFalse(self.is_cached())
+
+    def test_per_process_cache_rejected(self):
+        self.assertEqual(
+            [error.id for error in check_token_cache(None)], ['api.E001'])
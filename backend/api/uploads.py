@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.files.uploadhandler import (SkipFile,
+                                             TemporaryFileUploadHandler)
+
+TOO_LARGE_MESSAGE = 'Размер файла не может превышать {max_size}.'
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.MAX_IMAGE_UPLOAD_SIZE:
+            # Ошибку поля формирует сериализатор: здесь, внутри разбора
+            # multipart, её некому перехватить.
+            self.request.oversized_files = {
+                *getattr(self.request, 'oversized_files', ()),
+                self.field_name,
+            }
+            raise SkipFile
+        return super().receive_data_chunk(raw_data, start)
@@ -1,85 +1,209 @@
-from django.db.models import Sum
-from django.shortcuts import HttpResponse, get_object_or_404
+from django.db.models import F, Prefetch
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, views, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import ListAPIView
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.permissions import (AllowAny, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 
 from api.filters import IngredientSearchFilter, RecipesFilter
-from api.pagination import CustomPagination
+from api.mixins import (AnonymousListCacheMixin, ConditionalGetMixin,
+                        SerializationTimingMixin, normalize_query)
+from api.pagination import (CustomPagination, RecipeCursorPagination,
+                            RecipePagination)
 from api.permissions import IsAuthorOrReadOnly
+from api.renderers import (ShoppingListCSVRenderer, ShoppingListJSONRenderer,
+                           ShoppingListPDFRenderer, ShoppingListTextRenderer)
 from api.serializers import (AddRecipeSerializer, CustomUserSerializer,
-                             FavoriteSerializer, IngredientSerializer,
-                             RecipeSerializer, ShoppingCartSerializer,
-                             SubscriptionSerializer, TagSerializer)
-from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+                             IngredientSerializer, RecipeIdsSerializer,
+                             RecipeSerializer, RecipesLimitSerializer,
+                             ShortRecipeSerializer, SubscriptionSerializer,
+                             TagSerializer)
+from api.uploads import LimitedTemporaryFileUploadHandler
+from recipes import user_lists
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingListItem, ShoppingСart, Tag)
+from recipes.rankings import RANKED_ORDERINGS
+from recipes.versions import (INGREDIENTS, RANKINGS, RECIPES, TAGS, USERS,
+                              user_flags)
 from users.models import Subscription, User
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(SerializationTimingMixin, ConditionalGetMixin,
+                 viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
     pagination_class = None
 
+    def get_validators(self):
+        return self.make_etag(*self.request_versions(TAGS)), None
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+
+class IngredientViewSet(SerializationTimingMixin, ConditionalGetMixin,
+                        viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (AllowAny,)
     filter_backends = (IngredientSearchFilter,)
-    search_fields = ('^name',)
     pagination_class = None
 
+    def get_validators(self):
+        return self.make_etag(*self.request_versions(INGREDIENTS)), None
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.all()
+class RecipeViewSet(SerializationTimingMixin, AnonymousListCacheMixin,
+                    ConditionalGetMixin, viewsets.ModelViewSet):
     permission_classes = (IsAuthorOrReadOnly,)
-    pagination_class = CustomPagination
+    pagination_class = RecipePagination
+    parser_classes = (JSONParser, MultiPartParser, FormParser)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipesFilter
+    cache_query_params = ('tags', 'author', 'search', 'ordering', 'page',
+                          'limit', 'pagination', 'cursor')
+    cache_versions = (RECIPES, TAGS, INGREDIENTS, USERS)
+
+    def is_ranked(self):
+        return self.request.query_params.get('ordering') in RANKED_ORDERINGS
+
+    def get_cache_versions(self):
+        if self.is_ranked():
+            return (*self.cache_versions, RANKINGS)
+        return self.cache_versions
+
+    def initialize_request(self, request, *args, **kwargs):
+        if self.action_map.get(request.method.lower()) in (
+                'create', 'update', 'partial_update'):
+            request.upload_handlers = [
+                LimitedTemporaryFileUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
+    def get_versions(self, *names):
+        names = [*names, TAGS, INGREDIENTS, USERS]
+        if self.request.user.is_authenticated:
+            names.append(user_flags(self.request.user.id))
+        if self.action == 'list' and self.is_ranked():
+            names.append(RANKINGS)
+        return self.request_versions(*names)
+
+    def get_list_validators(self):
+        # Страница зависит только от параметров запроса и данных, которые
+        # отслеживают версии, поэтому агрегат по рецептам не нужен.
+        return self.make_etag(
+            self.request.get_host(),
+            normalize_query(self.request.query_params),
+            *self.get_versions(RECIPES)), None
+
+    def get_object_validators(self):
+        try:
+            updated_at = Recipe.objects.filter(
+                pk=self.kwargs['pk']).values_list(
+                    'updated_at', flat=True).first()
+        except (TypeError, ValueError):
+            updated_at = None
+        if updated_at is None:
+            return None, None
+        last_modified = (
+            updated_at if self.request.user.is_anonymous else None)
+        return self.make_etag(
+            self.kwargs['pk'], updated_at, *self.get_versions()
+        ), last_modified
+
+    def get_queryset(self):
+        if self.action in ('list', 'retrieve', 'feed'):
+            user = self.request.user
+            recipes = Recipe.objects.all()
+            if self.action == 'retrieve':
+                recipes = recipes.with_user_flags(user)
+            return recipes.defer(
+                'search_vector'
+            ).prefetch_related(
+                'tags',
+                Prefetch(
+                    'author',
+                    queryset=User.objects.with_is_subscribed(user)
+                ),
+                Prefetch(
+                    'ingredient_recipe',
+                    queryset=IngredientInRecipe.objects.select_related(
+                        'ingredient')
+                ),
+            )
+        return Recipe.objects.all()
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is None:
+            return page
+        return user_lists.set_flags(self.request.user, page)
 
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in ('list', 'retrieve', 'feed'):
             return RecipeSerializer
         return AddRecipeSerializer
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
-    def recipe_post_delete(self, pk, serializer_class):
-        user = self.request.user
-        recipe = get_object_or_404(Recipe, pk=pk)
-        model_obj = serializer_class.Meta.model.objects.filter(
-            user=user, recipe=recipe
-        )
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        pagination_class=RecipeCursorPagination,
+    )
+    def feed(self, request):
+        page = self.paginate_queryset(
+            self.get_queryset().feed(request.user))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
+    def recipe_post_delete(self, pk, model):
+        user = self.request.user
         if self.request.method == 'POST':
-            serializer = serializer_class(
-                data={'user': user.id, 'recipe': pk},
-                context={'request': self.request}
-            )
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
+            recipe = get_object_or_404(Recipe.objects.only(
+                'id', 'name', 'image', 'image_variants', 'cooking_time'),
+                pk=pk)
+            if not user_lists.add_recipes(model, user.id, [recipe.id]):
+                raise ValidationError(
+                    {'non_field_errors': ['Рецепт уже в избранном!']})
+            serializer = self.timed(ShortRecipeSerializer(
+                recipe, context={'request': self.request}))
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        if self.request.method == 'DELETE':
-            if not model_obj.exists():
-                return Response(status=status.HTTP_400_BAD_REQUEST)
-        model_obj.delete()
+        if not user_lists.remove_recipes(model, user.id, [pk]):
+            get_object_or_404(Recipe, pk=pk)
+            return Response(status=status.HTTP_400_BAD_REQUEST)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def recipes_bulk(self, model):
+        user = self.request.user
+        if (self.request.method == 'DELETE'
+                and 'recipes' not in self.request.data):
+            return Response(
+                {'removed': user_lists.remove_recipes(model, user.id)})
+        serializer = RecipeIdsSerializer(data=self.request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = [
+            recipe.id for recipe in serializer.validated_data['recipes']]
+        if self.request.method == 'POST':
+            return Response(
+                {'added': user_lists.add_recipes(model, user.id, recipe_ids)},
+                status=status.HTTP_201_CREATED)
+        return Response(
+            {'removed': user_lists.remove_recipes(model, user.id, recipe_ids)})
+
     @action(
         methods=['POST', 'DELETE'],
         detail=True,
         permission_classes=(IsAuthenticated,)
     )
     def favorite(self, request, pk=None):
-        return self.recipe_post_delete(pk, FavoriteSerializer)
+        return self.recipe_post_delete(pk, Favorite)
 
     @action(
         methods=['POST', 'DELETE'],
@@ -87,55 +211,111 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=(IsAuthenticated,)
     )
     def shopping_cart(self, request, pk=None):
-        return self.recipe_post_delete(pk, ShoppingCartSerializer)
+        return self.recipe_post_delete(pk, ShoppingСart)
+
+    @action(
+        methods=['POST', 'DELETE'],
+        detail=False,
+        url_path='favorite',
+        url_name='favorite-bulk',
+        permission_classes=(IsAuthenticated,)
+    )
+    def favorite_bulk(self, request):
+        return self.recipes_bulk(Favorite)
+
+    @action(
+        methods=['POST', 'DELETE'],
+        detail=False,
+        url_path='shopping_cart',
+        url_name='shopping-cart-bulk',
+        permission_classes=(IsAuthenticated,)
+    )
+    def shopping_cart_bulk(self, request):
+        return self.recipes_bulk(ShoppingСart)
 
     @action(
         detail=False,
         methods=['get', ],
         url_path='download_shopping_cart',
         permission_classes=(IsAuthenticated,),
-        pagination_class=None
+        pagination_class=None,
+        renderer_classes=(
+            ShoppingListTextRenderer,
+            ShoppingListCSVRenderer,
+            ShoppingListJSONRenderer,
+            ShoppingListPDFRenderer,
+        ),
     )
     def download_shopping_cart(self, request):
-        ingredients = IngredientInRecipe.objects.filter(
-            recipe__shoppingcart_recipe__user=request.user).order_by(
-                'ingredient__name').values(
+        ingredients = ShoppingListItem.objects.filter(
+            user=request.user
+        ).order_by('ingredient__name').values(
             'ingredient__name',
-            'ingredient__measurement_unit'
-        ).annotate(ingredient_amount=Sum('amount'))
-        shopping_list = ['Список покупок:\n']
-        for ingredient in ingredients:
-            name = ingredient['ingredient__name']
-            measurement_unit = ingredient['ingredient__measurement_unit']
-            amount = ingredient['ingredient_amount']
-            shopping_list.append(f'\n{name} - {amount}, {measurement_unit}')
-        filename = 'shopping_list.txt'
-        response = HttpResponse(shopping_list, content_type='text/plain')
+            'ingredient__measurement_unit',
+            ingredient_amount=F('amount'),
+        )
+        renderer = request.accepted_renderer
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        response = StreamingHttpResponse(
+            renderer.stream(ingredients.iterator()),
+            content_type=content_type
+        )
+        filename = f'shopping_list.{renderer.format}'
         response['Content-Disposition'] = f'attachment; filename={filename}'
         return response
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(SerializationTimingMixin, UserViewSet):
     queryset = User.objects.all()
     serializer_class = CustomUserSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
 
+    def get_queryset(self):
+        return super().get_queryset().with_is_subscribed(self.request.user)
+
+
+class RecipesLimitMixin:
+
+    def get_recipes_limit(self):
+        serializer = RecipesLimitSerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data.get('recipes_limit')
 
-class SubscriptionViewSet(ListAPIView):
+
+class SubscriptionViewSet(SerializationTimingMixin, RecipesLimitMixin,
+                          ListAPIView):
     serializer_class = SubscriptionSerializer
     pagination_class = CustomPagination
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
-        return User.objects.filter(following__user=self.request.user)
+        user = self.request.user
+        return User.objects.filter(
+            following__user=user
+        ).with_is_subscribed(user).order_by('id')
+
+    def list(self, request, *args, **kwargs):
+        recipes_limit = self.get_recipes_limit()
+        page = self.paginate_queryset(self.get_queryset())
+        latest_recipes = {author.id: [] for author in page}
+        for recipe in Recipe.objects.latest_by_author(page, recipes_limit):
+            latest_recipes[recipe.author_id].append(recipe)
+        for author in page:
+            author.latest_recipes = latest_recipes[author.id]
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
-class SubscribeView(views.APIView):
+class SubscribeView(SerializationTimingMixin, RecipesLimitMixin,
+                    views.APIView):
     serializer_class = SubscriptionSerializer
     pagination_class = CustomPagination
     permission_classes = (IsAuthenticated,)
 
     def post(self, request, *args, **kwargs):
+        recipes_limit = self.get_recipes_limit()
         user_id = self.kwargs.get('user_id')
         if user_id == request.user.id:
             return Response(
@@ -156,7 +336,10 @@ class SubscribeView(views.APIView):
             author_id=user_id
         )
         return Response(
-            self.serializer_class(author, context={'request': request}).data,
+            self.timed(self.serializer_class(author, context={
+                'request': request,
+                'recipes_limit': recipes_limit,
+            })).data,
             status=status.HTTP_201_CREATED
         )
 
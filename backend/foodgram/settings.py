@@ -30,6 +30,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'django_filters',
@@ -40,11 +41,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -85,6 +88,49 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    },
+    'responses': {
+        'BACKEND': os.getenv(
+            'RESPONSE_CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('RESPONSE_CACHE_LOCATION', default='responses'),
+        'TIMEOUT': int(os.getenv('RESPONSE_CACHE_TIMEOUT', default=300)),
+    },
+    # Кеш токенов должен быть общим для всех процессов, иначе отзыв
+    # токена из другого процесса не виден до истечения TIMEOUT. По
+    # умолчанию кеширование отключено; см. проверку api.E001.
+    'tokens': {
+        'BACKEND': os.getenv(
+            'TOKEN_CACHE_BACKEND',
+            default='django.core.cache.backends.dummy.DummyCache'),
+        'LOCATION': os.getenv('TOKEN_CACHE_LOCATION', default='tokens'),
+        'TIMEOUT': int(os.getenv('TOKEN_CACHE_TIMEOUT', default=60)),
+    },
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.middleware': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -129,6 +175,14 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+IMAGE_PROCESSING_WORKERS = int(
+    os.getenv('IMAGE_PROCESSING_WORKERS', default=2))
+
+MAX_IMAGE_UPLOAD_SIZE = int(
+    os.getenv('MAX_IMAGE_UPLOAD_SIZE', default=10 * 1024 * 1024))
+
+MAX_IMAGE_DIMENSION = int(os.getenv('MAX_IMAGE_DIMENSION', default=5000))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -141,7 +195,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 }
 
@@ -164,3 +218,27 @@ MAX_LENGHT_EMAIL = 254
 MAX_LENGHT_USERNAME = 150
 
 MAX_LENGHT_PASSWORD = 150
+
+MAX_RECIPES_LIMIT = 100
+
+MAX_BULK_RECIPES = 500
+
+SEARCH_CONFIG = 'russian'
+
+# Как часто (в секундах) индекс ингредиентов сверяет версию с базой,
+# если вызывающий код не передал её сам.
+INGREDIENT_INDEX_CHECK_INTERVAL = float(
+    os.getenv('INGREDIENT_INDEX_CHECK_INTERVAL', default=5))
+
+RANKING_CART_WEIGHT = 0.5
+
+TRENDING_WINDOW_DAYS = 7
+
+TRENDING_HALF_LIFE_HOURS = 24
+
+PROFILING_ROOT = os.getenv(
+    'PROFILING_ROOT', default=os.path.join(BASE_DIR, 'profiles'))
+
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', default=0))
+
+PROFILING_MAX_REPORTS = int(os.getenv('PROFILING_MAX_REPORTS', default=100))
@@ -21,15 +21,13 @@ class TagAdmin(admin.ModelAdmin):
 
 
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'name', 'author', 'count_favorite')
+    list_display = ('pk', 'name', 'author', 'favorites_count',
+                    'in_carts_count')
     search_fields = ('author', 'name', 'tags')
     list_filter = ('author', 'name', 'tags')
     inlines = [IngredientInRecipeInline]
     empty_value_display = '-пусто-'
 
-    def count_favorite(self, obj):
-        return obj.favorite_recipe.count()
-
 
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('pk', 'name', 'measurement_unit')
@@ -39,12 +37,12 @@ class IngredientAdmin(admin.ModelAdmin):
 
 
 class FavoriteAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'user', 'recipe')
+    list_display = ('pk', 'user', 'recipe', 'created')
     search_fields = ('user__username', 'recipe__name',)
 
 
 class ShoppingСartAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'user', 'recipe')
+    list_display = ('pk', 'user', 'recipe', 'created')
     search_fields = ('user__username', 'recipe__name',)
 
 
@@ -0,0 +1,63 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes.models import Favorite, Recipe, ShoppingСart
+from users.models import Subscription, User
+
+# Источник -> (модель со счётчиком, поле-ссылка источника, поле счётчика).
+COUNTERS = {
+    Favorite: (Recipe, 'recipe', 'favorites_count'),
+    ShoppingСart: (Recipe, 'recipe', 'in_carts_count'),
+    Recipe: (User, 'author', 'recipes_count'),
+    Subscription: (User, 'author', 'followers_count'),
+}
+BATCH_SIZE = 1000
+
+
+def apply(target, field, pks, delta):
+    rows = target.objects.filter(pk__in=pks)
+    if len(pks) == 1:
+        rows.update(**{field: Greatest(F(field) + delta, 0)})
+        return
+    with transaction.atomic():
+        # Блокируем строки по возрастанию pk, чтобы параллельные
+        # пакетные обновления не взаимоблокировались.
+        list(rows.select_for_update().order_by('pk').values_list(
+            'pk', flat=True))
+        rows.update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def change(source, target_ids, delta):
+    target, _, field = COUNTERS[source]
+    pks = sorted(set(target_ids))
+    if pks and delta:
+        # Горячие строки блокируются только на время одного UPDATE
+        # после коммита, а не на всю транзакцию запроса.
+        transaction.on_commit(lambda: apply(target, field, pks, delta))
+
+
+def instance_changed(instance, delta):
+    source = type(instance)
+    _, link, _ = COUNTERS[source]
+    change(source, (getattr(instance, f'{link}_id'),), delta)
+
+
+def actual_count(source, link):
+    return Coalesce(Subquery(
+        source.objects.filter(**{link: OuterRef('pk')}).order_by()
+        .values(link).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def reconcile(source, dry_run=False):
+    target, link, field = COUNTERS[source]
+    actual = actual_count(source, link)
+    pks = list(target.objects.annotate(actual=actual).exclude(
+        **{field: F('actual')}).order_by('pk').values_list('pk', flat=True))
+    if not dry_run:
+        for start in range(0, len(pks), BATCH_SIZE):
+            target.objects.filter(
+                pk__in=pks[start:start + BATCH_SIZE]
+            ).update(**{field: actual})
+    return len(pks)
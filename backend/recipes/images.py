@@ -0,0 +1,107 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from recipes.storage import content_storage
+from recipes.versions import RECIPES, bump_version
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SIZES = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'full': (1280, 1280),
+}
+IMAGE_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+VARIANTS_DIR = 'variants'
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_PROCESSING_WORKERS,
+    thread_name_prefix='recipe-images',
+)
+
+
+def variant_name(name, size, extension):
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(
+        directory, VARIANTS_DIR, f'{stem}_{size}.{extension}')
+
+
+def render_variants(name, storage=content_storage):
+    with storage.open(name) as file:
+        image = Image.open(file)
+        image.load()
+    image = ImageOps.exif_transpose(image).convert('RGB')
+    variants = {}
+    for size, box in IMAGE_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail(box, Image.LANCZOS)
+        variants[size] = {}
+        for extension, (image_format, options) in IMAGE_FORMATS.items():
+            buffer = BytesIO()
+            resized.save(buffer, image_format, **options)
+            variants[size][extension] = storage.save(
+                variant_name(name, size, extension),
+                ContentFile(buffer.getvalue()))
+    return {'source': name, 'sizes': variants}
+
+
+def process_recipe_image(recipe_id, name):
+    from recipes.models import Recipe
+
+    try:
+        variants = render_variants(name)
+    except Exception:
+        logger.exception('Не удалось обработать изображение %s', name)
+        return None
+    # updated_at входит в ETag рецепта: без него клиенты получат 304
+    # и продолжат показывать оригинал вместо вариантов.
+    Recipe.objects.filter(pk=recipe_id, image=name).update(
+        image_variants=variants, updated_at=timezone.now())
+    bump_version(RECIPES)
+    return variants
+
+
+def _process_in_background(recipe_id, name):
+    try:
+        process_recipe_image(recipe_id, name)
+    finally:
+        connection.close()
+
+
+def schedule_recipe_image(recipe):
+    name = recipe.image.name
+    if not name or recipe.image_variants.get('source') == name:
+        return
+    transaction.on_commit(
+        lambda: executor.submit(_process_in_background, recipe.pk, name))
+
+
+def variant_urls(recipe):
+    image = recipe.image
+    if not image:
+        return None
+    sizes = {}
+    if recipe.image_variants.get('source') == image.name:
+        sizes = recipe.image_variants.get('sizes', {})
+    return {
+        size: {
+            extension: (
+                image.storage.url(sizes[size][extension])
+                if extension in sizes.get(size, {}) else image.url
+            )
+            for extension in IMAGE_FORMATS
+        }
+        for size in IMAGE_SIZES
+    }
@@ -0,0 +1,56 @@
+import posixpath
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Delete recipe images that are not referenced by any recipe'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true')
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help='Keep files modified less than this many seconds ago')
+
+    @staticmethod
+    def referenced_names():
+        names = set()
+        recipes = Recipe.objects.values_list('image', 'image_variants')
+        for image, variants in recipes.iterator():
+            if image:
+                names.add(image)
+            for formats in variants.get('sizes', {}).values():
+                names.update(formats.values())
+        return names
+
+    def walk(self, storage, directory):
+        try:
+            directories, files = storage.listdir(directory)
+        except FileNotFoundError:
+            return
+        for name in files:
+            yield posixpath.join(directory, name)
+        for name in directories:
+            yield from self.walk(storage, posixpath.join(directory, name))
+
+    def handle(self, *args, **options):
+        field = Recipe._meta.get_field('image')
+        storage = field.storage
+        referenced = self.referenced_names()
+        threshold = time.time() - options['min_age']
+        removed = freed = 0
+        for name in self.walk(storage, field.upload_to.strip('/')):
+            if name in referenced:
+                continue
+            if storage.get_modified_time(name).timestamp() > threshold:
+                continue
+            size = storage.size(name)
+            if not options['dry_run']:
+                storage.delete(name)
+            removed += 1
+            freed += size
+        self.stdout.write(
+            f'Удалено файлов: {removed}, освобождено байт: {freed}')
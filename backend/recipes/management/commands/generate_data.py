@@ -0,0 +1,251 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from django.utils import timezone
+
+from recipes import counters, rankings, shopping_list
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingСart, Tag)
+from recipes.versions import RECIPES, TAGS, USERS, bump_version
+from users.models import Subscription, User
+
+FIRST_NAMES = (
+    'Анна', 'Мария', 'Елена', 'Ольга', 'Наталья', 'Ирина', 'Светлана',
+    'Иван', 'Алексей', 'Дмитрий', 'Сергей', 'Андрей', 'Михаил', 'Павел',
+)
+LAST_NAMES = (
+    'Иванова', 'Смирнова', 'Кузнецова', 'Попова', 'Соколова', 'Лебедева',
+    'Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Соколов', 'Лебедев',
+)
+DISH_ADJECTIVES = (
+    'Домашний', 'Быстрый', 'Летний', 'Острый', 'Сливочный', 'Пряный',
+    'Бабушкин', 'Праздничный', 'Постный', 'Запечённый', 'Тёплый',
+)
+DISHES = (
+    'суп', 'салат', 'пирог', 'омлет', 'плов', 'рагу', 'гуляш', 'борщ',
+    'соус', 'десерт', 'кекс', 'завтрак', 'ужин', 'гарнир', 'смузи',
+)
+TEXT_WORDS = (
+    'нарезать', 'смешать', 'добавить', 'обжарить', 'варить', 'посолить',
+    'остудить', 'подавать', 'минут', 'до', 'готовности', 'на', 'среднем',
+    'огне', 'в', 'духовке', 'сковороде', 'кастрюле', 'с', 'зеленью',
+)
+DEFAULT_TAGS = (
+    ('Завтрак', Tag.ORANGE, 'breakfast'),
+    ('Обед', Tag.GREEN, 'lunch'),
+    ('Ужин', Tag.BLUE, 'dinner'),
+    ('Десерт', Tag.YELLOW, 'dessert'),
+)
+PASSWORD = 'load-test-password'
+
+
+@contextmanager
+def manual_timestamps(model, *names):
+    fields = [model._meta.get_field(name) for name in names]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = 'Generate a seeded synthetic dataset for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--favorites', type=int, default=100000)
+        parser.add_argument('--carts', type=int, default=10000)
+        parser.add_argument('--subscriptions', type=int, default=20000)
+        parser.add_argument('--min-ingredients', type=int, default=3)
+        parser.add_argument('--max-ingredients', type=int, default=10)
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='Spread recipe publication dates over this many days')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        ingredient_ids = list(
+            Ingredient.objects.values_list('id', flat=True))
+        if not ingredient_ids:
+            raise CommandError(
+                'Сначала загрузите ингредиенты командой import_ingredients')
+        prefix = f'load{options["seed"]}_'
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(
+                f'Данные с seed={options["seed"]} уже созданы, '
+                'укажите другой --seed')
+
+        tag_ids = self.ensure_tags()
+        user_ids = self.create_users(prefix, options['users'])
+        recipe_ids = self.create_recipes(
+            user_ids, options['recipes'], options['days'])
+        self.create_recipe_links(
+            recipe_ids, ingredient_ids, tag_ids,
+            options['min_ingredients'], options['max_ingredients'])
+        with manual_timestamps(Favorite, 'created'):
+            self.create_pairs(
+                Favorite, 'recipe', user_ids, recipe_ids,
+                options['favorites'], options['days'])
+        with manual_timestamps(ShoppingСart, 'created'):
+            self.create_pairs(
+                ShoppingСart, 'recipe', user_ids, recipe_ids,
+                options['carts'], options['days'])
+        self.create_pairs(
+            Subscription, 'author', user_ids, user_ids,
+            options['subscriptions'])
+
+        Recipe.objects.filter(
+            search_vector__isnull=True).update_search_vector()
+        shopping_list.rebuild()
+        for source in counters.COUNTERS:
+            counters.reconcile(source)
+        rankings.refresh()
+        for name in (RECIPES, TAGS, USERS):
+            bump_version(name)
+
+    def insert(self, model, objects, **kwargs):
+        started = time.monotonic()
+        total = 0
+        while True:
+            batch = list(islice(objects, self.batch_size))
+            if not batch:
+                break
+            model.objects.bulk_create(batch, **kwargs)
+            total += len(batch)
+        elapsed = time.monotonic() - started
+        rate = total / elapsed if elapsed else total
+        self.stdout.write(
+            f'{model._meta.label}: {total} '
+            f'за {elapsed:.2f} с ({rate:.0f} строк/с)')
+        return total
+
+    def created_ids(self, model, objects):
+        last_id = model.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+        self.insert(model, objects)
+        return list(model.objects.filter(id__gt=last_id).order_by(
+            'id').values_list('id', flat=True))
+
+    def skewed(self, ids):
+        ids = list(ids)
+        self.rng.shuffle(ids)
+        weights = list(accumulate(
+            1 / (rank + 1) ** 1.1 for rank in range(len(ids))))
+        return ids, weights
+
+    def ensure_tags(self):
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, color=color, slug=slug)
+                for name, color, slug in DEFAULT_TAGS
+            )
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def create_users(self, prefix, count):
+        password = make_password(PASSWORD)
+        return self.created_ids(User, (
+            User(
+                username=f'{prefix}{number}',
+                email=f'{prefix}{number}@example.com',
+                first_name=self.rng.choice(FIRST_NAMES),
+                last_name=self.rng.choice(LAST_NAMES),
+                password=password,
+            )
+            for number in range(count)
+        ))
+
+    def create_recipes(self, user_ids, count, days):
+        authors, weights = self.skewed(user_ids)
+        now = timezone.now()
+
+        def recipes():
+            for _ in range(count):
+                pub_date = now - timedelta(
+                    seconds=self.rng.uniform(0, days * 24 * 60 * 60))
+                name = (f'{self.rng.choice(DISH_ADJECTIVES)} '
+                        f'{self.rng.choice(DISHES)}')
+                text = ' '.join(self.rng.choices(
+                    TEXT_WORDS, k=self.rng.randint(20, 120)))
+                yield Recipe(
+                    author_id=self.rng.choices(
+                        authors, cum_weights=weights)[0],
+                    name=name,
+                    text=text,
+                    content_hash=Recipe.get_content_hash(name, text),
+                    cooking_time=self.rng.randint(5, 180),
+                    pub_date=pub_date,
+                    updated_at=pub_date,
+                )
+
+        with manual_timestamps(Recipe, 'pub_date', 'updated_at'):
+            return self.created_ids(Recipe, recipes())
+
+    def create_recipe_links(self, recipe_ids, ingredient_ids, tag_ids,
+                            min_ingredients, max_ingredients):
+        max_ingredients = min(max_ingredients, len(ingredient_ids))
+        min_ingredients = min(min_ingredients, max_ingredients)
+        self.insert(IngredientInRecipe, (
+            IngredientInRecipe(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=self.rng.choice((1, 2, 3, 5, 10, 50, 100, 200, 500)),
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in self.rng.sample(
+                ingredient_ids,
+                self.rng.randint(min_ingredients, max_ingredients))
+        ))
+        recipe_tag = Recipe.tags.through
+        self.insert(recipe_tag, (
+            recipe_tag(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in self.rng.sample(
+                tag_ids, self.rng.randint(1, min(2, len(tag_ids))))
+        ))
+
+    def create_pairs(self, model, target, owner_ids, target_ids, total,
+                     days=None):
+        if not owner_ids or len(target_ids) < 2 or total <= 0:
+            return
+        targets, weights = self.skewed(target_ids)
+        now = timezone.now()
+        mean = total / len(owner_ids)
+        limit = len(targets) // 2 or 1
+
+        def pairs():
+            remaining = total
+            for owner_id in owner_ids:
+                if remaining <= 0:
+                    return
+                count = min(int(self.rng.expovariate(1 / mean) + 0.5),
+                            remaining, limit)
+                chosen = set()
+                for _ in range(10):
+                    if len(chosen) >= count:
+                        break
+                    chosen.update(self.rng.choices(
+                        targets, cum_weights=weights, k=count - len(chosen)))
+                    chosen.discard(owner_id)
+                remaining -= len(chosen)
+                for target_id in chosen:
+                    extra = {}
+                    if days is not None:
+                        extra['created'] = now - timedelta(
+                            seconds=self.rng.uniform(0, days * 24 * 60 * 60))
+                    yield model(user_id=owner_id, **{
+                        f'{target}_id': target_id}, **extra)
+
+        self.insert(model, pairs(), ignore_conflicts=True)
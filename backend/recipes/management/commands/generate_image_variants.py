@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Generate resized image variants for existing recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true')
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').exclude(
+            image__isnull=True).only('id', 'image', 'image_variants')
+        processed = failed = 0
+        for recipe in recipes.iterator():
+            if (not options['force'] and recipe.image_variants.get(
+                    'source') == recipe.image.name):
+                continue
+            if process_recipe_image(recipe.pk, recipe.image.name) is None:
+                failed += 1
+            else:
+                processed += 1
+        self.stdout.write(
+            f'Обработано изображений: {processed}, ошибок: {failed}')
@@ -1,32 +1,152 @@
+import json
 import os
+import time
 from csv import reader
+from io import StringIO
+from itertools import islice
 
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 
 from recipes.models import Ingredient
+from recipes.versions import INGREDIENTS, bump_version
 
 DATA_ROOT = os.path.join(settings.BASE_DIR, 'data')
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    for row in reader(file):
+        if row:
+            name, measurement_unit = row
+            yield name, measurement_unit
+
+
+def read_json(file):
+    decoder = json.JSONDecoder()
+    buffer = file.read(JSON_CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Файл должен содержать JSON-массив')
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip(', \t\r\n')
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except ValueError:
+            chunk = file.read(JSON_CHUNK_SIZE)
+            if not chunk:
+                raise CommandError('Некорректный JSON')
+            buffer += chunk
+            continue
+        yield item['name'], item['measurement_unit']
+        buffer = buffer[end:]
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
+
+
+def copy_value(value):
+    return (value.replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
 
 
 class Command(BaseCommand):
-    help = 'Load ingredients from csv file to database'
+    help = 'Load ingredients from csv or json file to database'
 
     def add_arguments(self, parser):
         parser.add_argument('filename', default='ingredients.csv', nargs='?',
                             type=str)
+        parser.add_argument('--format', choices=READERS)
+        parser.add_argument('--batch-size', type=int, default=1000)
 
     def handle(self, *args, **options):
+        file_format = options['format'] or os.path.splitext(
+            options['filename'])[1].lstrip('.').lower()
+        if file_format not in READERS:
+            raise CommandError(
+                'Укажите формат файла: ' + ', '.join(READERS))
         try:
             with open(os.path.join(DATA_ROOT, options['filename']), 'r',
-                      encoding='utf-8') as file_csv:
-                data = reader(file_csv)
-                for row in data:
-                    name, measurement_unit = row
-                    Ingredient.objects.get_or_create(
-                        name=name,
-                        measurement_unit=measurement_unit
-                    )
+                      encoding='utf-8') as file:
+                self.load(READERS[file_format](file), options['batch_size'])
         except FileNotFoundError:
             msg = 'Добавьте файл c данными в директорию data'
             raise CommandError(msg)
+
+    def load(self, rows, batch_size):
+        started = time.monotonic()
+        use_copy = connection.vendor == 'postgresql'
+        total = 0
+        with transaction.atomic():
+            before = Ingredient.objects.count()
+            if use_copy:
+                self.create_staging_table()
+            rows = (
+                (name.strip(), measurement_unit.strip())
+                for name, measurement_unit in rows
+            )
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                if use_copy:
+                    self.copy_batch(batch)
+                else:
+                    Ingredient.objects.bulk_create(
+                        (Ingredient(name=name,
+                                    measurement_unit=measurement_unit)
+                         for name, measurement_unit in batch),
+                        ignore_conflicts=True,
+                    )
+                total += len(batch)
+                self.report('Обработано строк', total, started)
+            if use_copy:
+                self.merge_staging_table()
+            created = Ingredient.objects.count() - before
+        if created:
+            bump_version(INGREDIENTS)
+        self.report(f'Добавлено ингредиентов: {created}, строк', total,
+                    started)
+
+    def report(self, message, total, started):
+        elapsed = time.monotonic() - started
+        rate = total / elapsed if elapsed else total
+        self.stdout.write(
+            f'{message}: {total} за {elapsed:.2f} с ({rate:.0f} строк/с)')
+
+    @staticmethod
+    def create_staging_table():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE ingredient_import '
+                '(name varchar(200), measurement_unit varchar(200)) '
+                'ON COMMIT DROP'
+            )
+
+    @staticmethod
+    def copy_batch(batch):
+        buffer = StringIO(''.join(
+            f'{copy_value(name)}\t{copy_value(measurement_unit)}\n'
+            for name, measurement_unit in batch
+        ))
+        with connection.cursor() as cursor:
+            cursor.cursor.copy_expert(
+                'COPY ingredient_import (name, measurement_unit) '
+                'FROM STDIN', buffer)
+
+    @staticmethod
+    def merge_staging_table():
+        table = Ingredient._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT DISTINCT name, measurement_unit '
+                'FROM ingredient_import '
+                'ON CONFLICT (name, measurement_unit) DO NOTHING'
+            )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import shopping_list
+
+
+class Command(BaseCommand):
+    help = 'Rebuild or verify aggregated shopping lists'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', type=int,
+                            dest='users')
+        parser.add_argument('--verify', action='store_true')
+
+    def handle(self, *args, **options):
+        drift = shopping_list.find_drift(options['users'])
+        for (user_id, ingredient_id), (stored, expected) in sorted(
+                drift.items()):
+            self.stdout.write(
+                f'user={user_id} ingredient={ingredient_id}: '
+                f'stored={stored} expected={expected}')
+        if options['verify']:
+            if drift:
+                raise CommandError(f'Расхождений: {len(drift)}')
+            self.stdout.write('Списки покупок согласованы')
+            return
+        shopping_list.rebuild(options['users'])
+        self.stdout.write(f'Исправлено расхождений: {len(drift)}')
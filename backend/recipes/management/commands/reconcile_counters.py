@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import counters
+
+
+class Command(BaseCommand):
+    help = 'Recalculate or verify denormalized recipe and user counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true')
+
+    def handle(self, *args, **options):
+        total = 0
+        for source, (target, _, field) in counters.COUNTERS.items():
+            drift = counters.reconcile(source, dry_run=options['verify'])
+            self.stdout.write(f'{target._meta.label}.{field}: {drift}')
+            total += drift
+        if options['verify']:
+            if total:
+                raise CommandError(f'Расхождений: {total}')
+            self.stdout.write('Счётчики согласованы')
+            return
+        self.stdout.write(f'Исправлено расхождений: {total}')
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes import rankings
+
+
+class Command(BaseCommand):
+    help = 'Recalculate popular and trending recipe rankings'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = rankings.refresh()
+        self.stdout.write(
+            f'Рейтинги пересчитаны: {total} рецептов '
+            f'за {time.monotonic() - started:.2f} с')
@@ -0,0 +1,51 @@
+# Generated by Django 3.2 on 2026-10-18 19:07
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+SEARCH_INDEXES = (
+    'CREATE INDEX recipes_recipe_search_vector_gin '
+    'ON recipes_recipe USING gin (search_vector)',
+    'CREATE INDEX recipes_recipe_name_trgm '
+    'ON recipes_recipe USING gin (name gin_trgm_ops)',
+)
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in SEARCH_INDEXES:
+        schema_editor.execute(sql)
+    schema_editor.execute(
+        'UPDATE recipes_recipe SET search_vector = '
+        "setweight(to_tsvector(%s, name), 'A') "
+        "|| setweight(to_tsvector(%s, text), 'B')",
+        (settings.SEARCH_CONFIG, settings.SEARCH_CONFIG)
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS recipes_recipe_name_trgm')
+    schema_editor.execute(
+        'DROP INDEX IF EXISTS recipes_recipe_search_vector_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_alter_tag_color'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
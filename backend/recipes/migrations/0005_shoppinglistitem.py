@@ -0,0 +1,54 @@
+# Generated by Django 3.2 on 2026-10-18 19:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def fill_shopping_lists(apps, schema_editor):
+    IngredientInRecipe = apps.get_model('recipes', 'IngredientInRecipe')
+    ShoppingListItem = apps.get_model('recipes', 'ShoppingListItem')
+    totals = IngredientInRecipe.objects.filter(
+        recipe__shoppingcart_recipe__isnull=False
+    ).values(
+        'recipe__shoppingcart_recipe__user', 'ingredient'
+    ).annotate(total=Sum('amount')).order_by()
+    ShoppingListItem.objects.bulk_create(
+        ShoppingListItem(
+            user_id=row['recipe__shoppingcart_recipe__user'],
+            ingredient_id=row['ingredient'],
+            amount=row['total'],
+        )
+        for row in totals
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0004_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(verbose_name='Количество ингридиента')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_items', to='recipes.ingredient')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Позиция списка покупок',
+                'verbose_name_plural': 'Позиции списков покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shopping_list_item'),
+        ),
+        migrations.RunPython(
+            fill_shopping_lists, migrations.RunPython.noop),
+    ]
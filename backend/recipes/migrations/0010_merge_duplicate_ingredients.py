@@ -0,0 +1,49 @@
+# Generated by Django 3.2 on 2026-10-18 19:17
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_rows(model, owner, keep, duplicates):
+    rows_by_owner = {}
+    for row in model.objects.filter(ingredient_id__in=[keep, *duplicates]):
+        rows_by_owner.setdefault(
+            getattr(row, f'{owner}_id'), []).append(row)
+    for rows in rows_by_owner.values():
+        rows.sort(key=lambda row: row.ingredient_id != keep)
+        target, *others = rows
+        if others:
+            target.amount += sum(row.amount for row in others)
+            model.objects.filter(pk__in=[row.pk for row in others]).delete()
+        target.ingredient_id = keep
+        target.save(update_fields=['ingredient', 'amount'])
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientInRecipe = apps.get_model('recipes', 'IngredientInRecipe')
+    ShoppingListItem = apps.get_model('recipes', 'ShoppingListItem')
+    groups = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(keep=Min('id'), total=Count('id')).filter(
+        total__gt=1).order_by()
+    for group in groups:
+        duplicates = list(Ingredient.objects.filter(
+            name=group['name'],
+            measurement_unit=group['measurement_unit'],
+        ).exclude(id=group['keep']).values_list('id', flat=True))
+        merge_rows(IngredientInRecipe, 'recipe', group['keep'], duplicates)
+        merge_rows(ShoppingListItem, 'user', group['keep'], duplicates)
+        Ingredient.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_image_content_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop),
+    ]
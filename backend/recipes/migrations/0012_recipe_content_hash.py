@@ -0,0 +1,34 @@
+# Generated by Django 3.2 on 2026-10-18 19:25
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def fill_content_hash(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    batch = []
+    for recipe in Recipe.objects.only('id', 'name', 'text').iterator():
+        recipe.content_hash = hashlib.sha256(
+            f'{recipe.name}\0{recipe.text}'.encode()).hexdigest()
+        batch.append(recipe)
+        if len(batch) == 1000:
+            Recipe.objects.bulk_update(batch, ['content_hash'])
+            batch = []
+    Recipe.objects.bulk_update(batch, ['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_ingredient_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='content_hash',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=64, verbose_name='Хеш названия и описания'),
+        ),
+        migrations.RunPython(fill_content_hash, migrations.RunPython.noop),
+    ]
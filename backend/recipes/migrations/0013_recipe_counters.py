@@ -0,0 +1,46 @@
+# Generated by Django 3.2 on 2026-10-18 19:30
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('recipes', 'Favorite', 'recipes', 'Recipe', 'recipe', 'favorites_count'),
+    ('recipes', 'ShoppingСart', 'recipes', 'Recipe', 'recipe',
+     'in_carts_count'),
+    ('recipes', 'Recipe', 'users', 'User', 'author', 'recipes_count'),
+    ('users', 'Subscription', 'users', 'User', 'author', 'followers_count'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for source_app, source, target_app, target, link, field in COUNTERS:
+        source = apps.get_model(source_app, source)
+        apps.get_model(target_app, target).objects.update(**{
+            field: Coalesce(Subquery(
+                source.objects.filter(**{link: OuterRef('pk')}).order_by()
+                .values(link).annotate(total=Count('pk')).values('total')
+            ), 0)
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_recipe_content_hash'),
+        ('users', '0003_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в список покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
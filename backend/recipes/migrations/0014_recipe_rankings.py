@@ -0,0 +1,52 @@
+# Generated by Django 3.2 on 2026-10-18 19:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorite',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='shoppingсart',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['cooking_time', '-pub_date', '-id'], name='recipe_cooking_time_idx'),
+        ),
+        migrations.CreateModel(
+            name='RecipeRanking',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('popular', models.FloatField(default=0, verbose_name='Популярность')),
+                ('trending', models.FloatField(default=0, verbose_name='Популярность за последнее время')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата расчёта')),
+            ],
+            options={
+                'verbose_name': 'Рейтинг рецепта',
+                'verbose_name_plural': 'Рейтинги рецептов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='reciperanking',
+            index=models.Index(fields=['-popular', '-recipe'], name='ranking_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reciperanking',
+            index=models.Index(fields=['-trending', '-recipe'], name='ranking_trending_idx'),
+        ),
+    ]
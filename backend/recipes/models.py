@@ -1,6 +1,16 @@
+import hashlib
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector, SearchVectorField,
+                                            TrigramSimilarity)
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connections, models
+from django.db.models.functions import RowNumber
+
+from recipes.storage import content_storage
+from users.models import Subscription
 
 User = get_user_model()
 
@@ -19,6 +29,12 @@ class Ingredient(models.Model):
         ordering = ('name',)
         verbose_name = 'Ингридиент'
         verbose_name_plural = 'Ингридиенты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient'
+            )
+        ]
 
     def __str__(self):
         return self.name
@@ -63,6 +79,76 @@ class Tag(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+
+    def with_user_flags(self, user):
+        if user.is_anonymous:
+            return self
+        return self.annotate(
+            is_favorited=models.Exists(Favorite.objects.filter(
+                user=user, recipe=models.OuterRef('pk'))),
+            is_in_shopping_cart=models.Exists(ShoppingСart.objects.filter(
+                user=user, recipe=models.OuterRef('pk'))),
+        )
+
+    def latest_by_author(self, authors, limit=None):
+        recipes = self.filter(author__in=authors).only(
+            'id', 'name', 'image', 'image_variants', 'cooking_time', 'author')
+        if limit is None:
+            return recipes
+        ranked = recipes.annotate(row_number=models.Window(
+            expression=RowNumber(),
+            partition_by=[models.F('author')],
+            order_by=[models.F('pub_date').desc(), models.F('id').desc()],
+        ))
+        sql, params = ranked.query.sql_with_params()
+        return self.raw(
+            f'SELECT * FROM ({sql}) AS ranked '
+            'WHERE ranked.row_number <= %s '
+            'ORDER BY ranked.author_id, ranked.row_number',
+            (*params, limit)
+        )
+
+    def search(self, query):
+        if connections[self.db].vendor != 'postgresql':
+            return self.filter(
+                models.Q(name__icontains=query)
+                | models.Q(text__icontains=query)
+            ).annotate(rank=models.Case(
+                models.When(name__icontains=query, then=1.0),
+                default=0.5,
+                output_field=models.FloatField(),
+            )).order_by('-rank', '-pub_date', '-id')
+        search_query = SearchQuery(
+            query, config=settings.SEARCH_CONFIG, search_type='websearch')
+        return self.annotate(
+            rank=SearchRank(models.F('search_vector'), search_query),
+            similarity=TrigramSimilarity('name', query),
+        ).filter(
+            models.Q(search_vector=search_query)
+            | models.Q(name__trigram_similar=query)
+        ).order_by('-rank', '-similarity', '-pub_date', '-id')
+
+    def feed(self, user):
+        return self.filter(author__in=Subscription.objects.filter(
+            user=user).values('author'))
+
+    def order_by_ranking(self, ordering):
+        if ordering == 'cooking_time':
+            return self.order_by('cooking_time', '-pub_date', '-id')
+        return self.order_by(
+            models.F(f'ranking__{ordering}').desc(nulls_last=True),
+            '-pub_date', '-id')
+
+    def update_search_vector(self):
+        if connections[self.db].vendor != 'postgresql':
+            return 0
+        return self.update(search_vector=(
+            SearchVector('name', weight='A', config=settings.SEARCH_CONFIG)
+            + SearchVector('text', weight='B', config=settings.SEARCH_CONFIG)
+        ))
+
+
 class Recipe(models.Model):
     name = models.CharField(
         max_length=200,
@@ -85,15 +171,25 @@ class Recipe(models.Model):
     )
     pub_date = models.DateTimeField(
         auto_now_add=True,
-        db_index=True,
         verbose_name='Дата'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
     image = models.ImageField(
         upload_to='recipes/',
+        storage=content_storage,
         null=True,
         blank=True,
         verbose_name='Картинка'
     )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Варианты картинки'
+    )
     text = models.TextField(
         verbose_name='Описание',
     )
@@ -105,15 +201,114 @@ class Recipe(models.Model):
         ],
         verbose_name='Время приготовления (в минутах)',
     )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор',
+    )
+    content_hash = models.CharField(
+        max_length=64,
+        db_index=True,
+        editable=False,
+        default='',
+        verbose_name='Хеш названия и описания',
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлений в избранное',
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлений в список покупок',
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
+    counter_fields = ('favorites_count', 'in_carts_count')
 
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['cooking_time', '-pub_date', '-id'],
+                name='recipe_cooking_time_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='recipe_author_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    @staticmethod
+    def get_content_hash(name, text):
+        return hashlib.sha256(f'{name}\0{text}'.encode()).hexdigest()
+
+    def save(self, *args, **kwargs):
+        self.content_hash = self.get_content_hash(self.name, self.text)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding:
+            # Счётчики меняются только через F(), иначе полное сохранение
+            # затрёт их устаревшими значениями.
+            skipped = {*self.counter_fields, *self.get_deferred_fields()}
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
+        elif update_fields is not None and (
+                {'name', 'text'} & set(update_fields)):
+            kwargs['update_fields'] = {*update_fields, 'content_hash'}
+        super().save(*args, **kwargs)
+
+
+class RecipeRanking(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ranking',
+        verbose_name='Рецепт',
+    )
+    popular = models.FloatField(
+        default=0,
+        verbose_name='Популярность',
+    )
+    trending = models.FloatField(
+        default=0,
+        verbose_name='Популярность за последнее время',
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата расчёта',
+    )
+
+    class Meta:
+        verbose_name = 'Рейтинг рецепта'
+        verbose_name_plural = 'Рейтинги рецептов'
+        indexes = [
+            models.Index(
+                fields=['-popular', '-recipe'],
+                name='ranking_popular_idx'
+            ),
+            models.Index(
+                fields=['-trending', '-recipe'],
+                name='ranking_trending_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.popular} / {self.trending}'
+
 
 class IngredientInRecipe(models.Model):
     recipe = models.ForeignKey(
@@ -160,6 +355,11 @@ class Favorite(models.Model):
         on_delete=models.CASCADE,
         related_name='favorite_recipe',
     )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Дата добавления',
+    )
 
     class Meta:
         verbose_name = 'Избранный рецепт'
@@ -186,6 +386,11 @@ class ShoppingСart(models.Model):
         on_delete=models.CASCADE,
         related_name='shoppingcart_recipe',
     )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Дата добавления',
+    )
 
     class Meta:
         verbose_name = 'Cписок покупок'
@@ -199,3 +404,51 @@ class ShoppingСart(models.Model):
 
     def __str__(self):
         return f'{self.user} - {self.recipe}'
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='Количество ингридиента',
+    )
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списков покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_item'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user} - {self.ingredient}: {self.amount}'
+
+
+class DataVersion(models.Model):
+    name = models.CharField(
+        max_length=100,
+        primary_key=True,
+        verbose_name='Название',
+    )
+    value = models.BigIntegerField(
+        default=0,
+        verbose_name='Версия',
+    )
+
+    class Meta:
+        verbose_name = 'Версия данных'
+        verbose_name_plural = 'Версии данных'
+
+    def __str__(self):
+        return f'{self.name}: {self.value}'
@@ -0,0 +1,63 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from recipes.models import Favorite, Recipe, RecipeRanking, ShoppingСart
+from recipes.versions import RANKINGS, bump_version
+
+ORDERINGS = ('popular', 'trending', 'cooking_time')
+RANKED_ORDERINGS = ('popular', 'trending')
+BATCH_SIZE = 1000
+
+
+def popular_scores():
+    recipes = Recipe.objects.filter(
+        Q(favorites_count__gt=0) | Q(in_carts_count__gt=0)
+    ).order_by().values_list('id', 'favorites_count', 'in_carts_count')
+    return {
+        pk: favorites + settings.RANKING_CART_WEIGHT * carts
+        for pk, favorites, carts in recipes.iterator()
+    }
+
+
+def trending_scores(now):
+    since = now - timedelta(days=settings.TRENDING_WINDOW_DAYS)
+    scores = defaultdict(float)
+    for model, weight in ((Favorite, 1),
+                          (ShoppingСart, settings.RANKING_CART_WEIGHT)):
+        # Считаем добавления по часам: затухание применяется к корзинам,
+        # а не к каждой строке.
+        buckets = model.objects.filter(created__gte=since).annotate(
+            hour=TruncHour('created')
+        ).order_by().values('recipe', 'hour').annotate(
+            total=Count('pk')
+        ).values_list('recipe', 'hour', 'total')
+        for recipe_id, hour, total in buckets.iterator():
+            age = (now - hour).total_seconds() / 3600
+            scores[recipe_id] += weight * total * 0.5 ** (
+                age / settings.TRENDING_HALF_LIFE_HOURS)
+    return scores
+
+
+@transaction.atomic
+def refresh(now=None):
+    now = now or timezone.now()
+    popular = popular_scores()
+    trending = trending_scores(now)
+    ranked = sorted({*popular, *trending})
+    RecipeRanking.objects.all().delete()
+    RecipeRanking.objects.bulk_create((
+        RecipeRanking(
+            recipe_id=pk,
+            popular=popular.get(pk, 0),
+            trending=trending.get(pk, 0),
+        )
+        for pk in ranked
+    ), batch_size=BATCH_SIZE)
+    bump_version(RANKINGS)
+    return len(ranked)
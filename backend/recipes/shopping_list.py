@@ -0,0 +1,123 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Sum
+
+from recipes.models import IngredientInRecipe, ShoppingListItem, ShoppingСart
+
+User = get_user_model()
+
+
+def expected_totals(user_ids=None):
+    filters = {'recipe__shoppingcart_recipe__isnull': False}
+    if user_ids is not None:
+        filters['recipe__shoppingcart_recipe__user__in'] = user_ids
+    return {
+        (user_id, ingredient_id): total
+        for user_id, ingredient_id, total in IngredientInRecipe.objects.filter(
+            **filters
+        ).values(
+            'recipe__shoppingcart_recipe__user', 'ingredient'
+        ).annotate(total=Sum('amount')).values_list(
+            'recipe__shoppingcart_recipe__user', 'ingredient', 'total'
+        ).order_by()
+    }
+
+
+def stored_totals(user_ids=None):
+    items = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        items = items.filter(user__in=user_ids)
+    return {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in items.values_list(
+            'user', 'ingredient', 'amount')
+    }
+
+
+@transaction.atomic
+def apply_deltas(deltas):
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    user_ids = sorted({user_id for user_id, _ in deltas})
+    list(User.objects.select_for_update().filter(
+        pk__in=user_ids).order_by('pk').values_list('pk', flat=True))
+    existing = {
+        (item.user_id, item.ingredient_id): item
+        for item in ShoppingListItem.objects.filter(
+            user__in=user_ids,
+            ingredient__in={ingredient_id for _, ingredient_id in deltas},
+        )
+    }
+    created, updated, deleted = [], [], []
+    for (user_id, ingredient_id), delta in deltas.items():
+        item = existing.get((user_id, ingredient_id))
+        if item is None:
+            if delta > 0:
+                created.append(ShoppingListItem(
+                    user_id=user_id, ingredient_id=ingredient_id,
+                    amount=delta))
+            continue
+        item.amount += delta
+        if item.amount > 0:
+            updated.append(item)
+        else:
+            deleted.append(item.pk)
+    ShoppingListItem.objects.bulk_create(created)
+    ShoppingListItem.objects.bulk_update(updated, ('amount',))
+    ShoppingListItem.objects.filter(pk__in=deleted).delete()
+
+
+def add_recipes(user_id, recipe_ids, sign=1):
+    deltas = Counter()
+    for ingredient_id, amount in IngredientInRecipe.objects.filter(
+            recipe__in=recipe_ids).values_list('ingredient', 'amount'):
+        deltas[(user_id, ingredient_id)] += sign * amount
+    apply_deltas(deltas)
+
+
+def remove_recipes(user_id, recipe_ids):
+    add_recipes(user_id, recipe_ids, sign=-1)
+
+
+def change_recipe(recipe_id, old_amounts, new_amounts):
+    changes = {
+        ingredient_id: new_amounts.get(ingredient_id, 0)
+        - old_amounts.get(ingredient_id, 0)
+        for ingredient_id in {*old_amounts, *new_amounts}
+    }
+    changes = {key: delta for key, delta in changes.items() if delta}
+    if not changes:
+        return
+    apply_deltas({
+        (user_id, ingredient_id): delta
+        for user_id in ShoppingСart.objects.filter(
+            recipe=recipe_id).values_list('user', flat=True)
+        for ingredient_id, delta in changes.items()
+    })
+
+
+def find_drift(user_ids=None):
+    expected = expected_totals(user_ids)
+    stored = stored_totals(user_ids)
+    return {
+        key: (stored.get(key, 0), expected.get(key, 0))
+        for key in {*expected, *stored}
+        if stored.get(key, 0) != expected.get(key, 0)
+    }
+
+
+@transaction.atomic
+def rebuild(user_ids=None):
+    items = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        items = items.filter(user__in=user_ids)
+    items.delete()
+    ShoppingListItem.objects.bulk_create(
+        ShoppingListItem(
+            user_id=user_id, ingredient_id=ingredient_id, amount=amount)
+        for (user_id, ingredient_id), amount in expected_totals(
+            user_ids).items()
+    )
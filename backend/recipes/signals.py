@@ -0,0 +1,66 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from recipes import counters, shopping_list
+from recipes.images import schedule_recipe_image
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingСart, Tag)
+from recipes.versions import (INGREDIENTS, RECIPES, TAGS, bump_version,
+                              user_flags)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(**kwargs):
+    bump_version(INGREDIENTS)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(**kwargs):
+    bump_version(TAGS)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingСart)
+def user_flags_changed(instance, **kwargs):
+    bump_version(user_flags(instance.user_id))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(instance, **kwargs):
+    Recipe.objects.filter(pk=instance.pk).update_search_vector()
+    schedule_recipe_image(instance)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=IngredientInRecipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipes_changed(**kwargs):
+    bump_version(RECIPES)
+
+
+@receiver(post_save, sender=ShoppingСart)
+def shopping_cart_added(instance, created, **kwargs):
+    if created:
+        shopping_list.add_recipes(instance.user_id, (instance.recipe_id,))
+
+
+@receiver(pre_delete, sender=ShoppingСart)
+def shopping_cart_removed(instance, **kwargs):
+    shopping_list.remove_recipes(instance.user_id, (instance.recipe_id,))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingСart)
+@receiver(post_save, sender=Recipe)
+def counter_source_saved(instance, created, **kwargs):
+    if created:
+        counters.instance_changed(instance, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingСart)
+@receiver(post_delete, sender=Recipe)
+def counter_source_deleted(instance, **kwargs):
+    counters.instance_changed(instance, -1)
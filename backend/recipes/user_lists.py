@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.db import connections, router, transaction
+from django.db.models import CharField, Value
+
+from recipes import counters, shopping_list
+from recipes.models import Favorite, ShoppingСart
+from recipes.versions import bump_version, user_flags
+
+User = get_user_model()
+
+
+FLAGS = {
+    Favorite: 'is_favorited',
+    ShoppingСart: 'is_in_shopping_cart',
+}
+
+
+def set_flags(user, recipes):
+    # Флаги ставятся только рецептам страницы одним запросом: аннотация
+    # Exists() на весь queryset попадает в COUNT(*) пагинатора и
+    # выполняет подзапросы для каждой строки таблицы.
+    found = set()
+    if user.is_authenticated and recipes:
+        ids = [recipe.id for recipe in recipes]
+        lookups = [
+            model.objects.filter(user=user, recipe__in=ids).annotate(
+                flag=Value(flag, output_field=CharField())
+            ).values_list('recipe', 'flag')
+            for model, flag in FLAGS.items()
+        ]
+        found = set(lookups[0].union(*lookups[1:], all=True))
+    for recipe in recipes:
+        for flag in FLAGS.values():
+            setattr(recipe, flag, (recipe.id, flag) in found)
+    return recipes
+
+
+def lock_user(user_id):
+    list(User.objects.select_for_update().filter(
+        pk=user_id).values_list('pk', flat=True))
+
+
+def delete_rows(model, user_id, recipe_ids=None):
+    # QuerySet.delete() отправляет pre/post_delete на каждую строку, а их
+    # обработчики уже пересчитывают счётчики и список покупок. Здесь
+    # последствия применяются одним пакетом, поэтому удаляем одним
+    # DELETE в обход сигналов.
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    user_column = model._meta.get_field('user').column
+    recipe_column = model._meta.get_field('recipe').column
+    sql = (f'DELETE FROM {quote(model._meta.db_table)} '
+           f'WHERE {quote(user_column)} = %s')
+    params = [user_id]
+    if recipe_ids is not None:
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        sql += f' AND {quote(recipe_column)} IN ({placeholders})'
+        params.extend(recipe_ids)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def recipes_changed(model, user_id, recipe_ids, sign):
+    if model is ShoppingСart:
+        shopping_list.add_recipes(user_id, recipe_ids, sign=sign)
+    counters.change(model, recipe_ids, sign)
+    bump_version(user_flags(user_id))
+
+
+@transaction.atomic
+def add_recipes(model, user_id, recipe_ids):
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    lock_user(user_id)
+    existing = set(model.objects.filter(
+        user=user_id, recipe__in=recipe_ids).values_list('recipe', flat=True))
+    added = [pk for pk in recipe_ids if pk not in existing]
+    if added:
+        model.objects.bulk_create(
+            (model(user_id=user_id, recipe_id=pk) for pk in added),
+            ignore_conflicts=True,
+        )
+        recipes_changed(model, user_id, added, 1)
+    return added
+
+
+@transaction.atomic
+def remove_recipes(model, user_id, recipe_ids=None):
+    lock_user(user_id)
+    items = model.objects.filter(user=user_id)
+    if recipe_ids is not None:
+        items = items.filter(recipe__in=recipe_ids)
+    removed = list(items.values_list('recipe', flat=True))
+    if removed:
+        delete_rows(
+            model, user_id, None if recipe_ids is None else removed)
+        recipes_changed(model, user_id, removed, -1)
+    return removed
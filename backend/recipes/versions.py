@@ -0,0 +1,61 @@
+import threading
+import time
+
+from django.db import transaction
+
+from recipes.models import DataVersion
+
+INGREDIENTS = 'ingredients'
+RANKINGS = 'rankings'
+RECIPES = 'recipes'
+TAGS = 'tags'
+USERS = 'users'
+
+
+class PendingVersions(threading.local):
+
+    def __init__(self):
+        self.names = set()
+
+
+_pending = PendingVersions()
+
+
+def user_flags(user_id):
+    return f'user-flags:{user_id}'
+
+
+def get_versions(*names):
+    # Версии хранятся в базе, чтобы изменения из других процессов
+    # (воркеров, manage.py, cron) были видны сразу.
+    versions = dict(DataVersion.objects.filter(
+        name__in=names).values_list('name', 'value'))
+    return [versions.get(name, 0) for name in names]
+
+
+def get_version(name):
+    return get_versions(name)[0]
+
+
+def _flush():
+    names, _pending.names = sorted(_pending.names), set()
+    if not names:
+        return
+    value = time.time_ns()
+    updated = DataVersion.objects.filter(name__in=names).update(value=value)
+    if updated < len(names):
+        DataVersion.objects.bulk_create(
+            [DataVersion(name=name, value=value) for name in names],
+            ignore_conflicts=True)
+
+
+def bump_version(name):
+    # Имена копятся до коммита и записываются одним UPDATE: строка
+    # версии общая для всех запросов, лишние записи в неё дорого стоят.
+    # Колбэк регистрируется при каждом вызове, потому что откат точки
+    # сохранения отбрасывает зарегистрированные в ней колбэки; первый
+    # выполненный колбэк записывает все имена, остальные ничего не делают.
+    # Имена из отменённой транзакции уйдут со следующим коммитом: лишнее
+    # обновление версии только сбрасывает кеш.
+    _pending.names.add(name)
+    transaction.on_commit(_flush)
@@ -4,7 +4,8 @@ from users.models import User
 
 
 class UserAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'username', 'first_name', 'last_name', 'email')
+    list_display = ('pk', 'username', 'first_name', 'last_name', 'email',
+                    'recipes_count', 'followers_count')
     search_fields = ('username', 'email',)
 
 
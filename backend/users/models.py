@@ -1,10 +1,25 @@
 from django.conf import settings
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
 
 from users.validators import username_validator
 
 
+class UserQuerySet(models.QuerySet):
+
+    def with_is_subscribed(self, user):
+        if user.is_anonymous:
+            return self
+        return self.annotate(
+            is_subscribed=models.Exists(Subscription.objects.filter(
+                user=user, author=models.OuterRef('pk')))
+        )
+
+
+class CustomUserManager(UserManager.from_queryset(UserQuerySet)):
+    pass
+
+
 class User(AbstractUser):
     email = models.EmailField(
         'Электронная почта',
@@ -25,6 +40,16 @@ class User(AbstractUser):
     password = models.CharField(
         'Пароль', max_length=settings.MAX_LENGHT_PASSWORD,
     )
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов', default=0, editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков', default=0, editable=False,
+    )
+
+    objects = CustomUserManager()
+
+    counter_fields = ('recipes_count', 'followers_count')
 
     class Meta:
         verbose_name = 'Пользователь'
@@ -33,6 +58,15 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    def save(self, *args, **kwargs):
+        if kwargs.get('update_fields') is None and not self._state.adding:
+            skipped = {*self.counter_fields, *self.get_deferred_fields()}
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
+
 
 class Subscription(models.Model):
     user = models.ForeignKey(
@@ -0,0 +1,34 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes import counters
+from recipes.versions import USERS, bump_version, user_flags
+from users.models import Subscription, User
+
+
+@receiver(post_save, sender=User)
+def user_saved(update_fields, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_version(USERS)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(**kwargs):
+    bump_version(USERS)
+
+
+@receiver((post_save, post_delete), sender=Subscription)
+def subscription_changed(instance, **kwargs):
+    bump_version(user_flags(instance.user_id))
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_saved(instance, created, **kwargs):
+    if created:
+        counters.instance_changed(instance, 1)
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(instance, **kwargs):
+    counters.instance_changed(instance, -1)